@@ -3,17 +3,49 @@ import pandas as pd
 import json
 import spacy
 import io
+import hashlib
+import time
+import asyncio
+import queue
+import threading
+from itertools import islice
 from dotenv import load_dotenv
 from sklearn.metrics import accuracy_score, precision_score, recall_score
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.callbacks import get_usage_metadata_callback
+from langchain_core.runnables import RunnableBranch
+from batch_engine import run_chain_batch, arun_chain_batch_as_completed
+from llm_cache import LLMCache, with_cache
+from trip_index import TripIndex
+from review_stream import iter_review_chunks, iter_review_records
+from run_journal import RunJournal, make_run_id, review_key
+from packed_classifier import classify_packed, packed_sentiment_prompt
+from local_classifier import LocalSentimentClassifier
 
 # --- Setup ---
 load_dotenv()
 nlp = spacy.load("en_core_web_sm")
+# Only entities are used, so skip tagger/parser/lemmatizer (keep tok2vec if NER listens to it)
+NER_PIPES = {"ner"}
+if "tok2vec" in nlp.pipe_names and "ner" in nlp.get_pipe("tok2vec").listening_components:
+    NER_PIPES.add("tok2vec")
+NER_DISABLED = [name for name in nlp.pipe_names if name not in NER_PIPES]
 llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
 
+@st.cache_resource
+def get_llm_cache():
+    return LLMCache("llm_cache.sqlite")
+
+llm_cache = get_llm_cache()
+
+@st.cache_resource
+def get_run_journal():
+    return RunJournal("run_journal.sqlite")
+
+run_journal = get_run_journal()
+
 # --- Prompty ---
 sentiment_parser = JsonOutputParser()
 
@@ -37,7 +69,7 @@ Make sure your response is valid JSON.
 """,
     input_variables=["review", "score"]
 )
-sentiment_chain = sentiment_prompt | llm | sentiment_parser
+sentiment_chain = with_cache(sentiment_prompt | llm | sentiment_parser, sentiment_prompt, llm, llm_cache)
 
 negative_prompt = PromptTemplate(
     template="""You are a customer service representative for a company.
@@ -59,7 +91,7 @@ Make sure to add appropriate newline after approximately every 80 characters for
 """,
     input_variables=["review"]
 )
-negative_chain = negative_prompt | llm | sentiment_parser
+negative_chain = with_cache(negative_prompt | llm | sentiment_parser, negative_prompt, llm, llm_cache)
 
 positive_prompt = PromptTemplate(
     template="""You are a customer service representative for a company.
@@ -79,40 +111,165 @@ Make sure to add appropriate newline after approximately every 80 characters for
 """,
     input_variables=["review"]
 )
-positive_chain = positive_prompt | llm | sentiment_parser
+positive_chain = with_cache(positive_prompt | llm | sentiment_parser, positive_prompt, llm, llm_cache)
+
+# Packed mode classifies many reviews per call (see packed_classifier.py)
+packed_sentiment_chain = packed_sentiment_prompt | llm | sentiment_parser
+
+# Routes a classified review to the matching customer message chain
+response_chain = RunnableBranch(
+    (lambda x: x["positive_sentiment"], (lambda x: {"review": x["review"]}) | positive_chain),
+    (lambda x: {"review": x["review"]}) | negative_chain
+)
 
 # --- Common functions ---
 def extract_locations(text: str):
-    doc = nlp(text)
-    return set(ent.text for ent in doc.ents if ent.label_ in ["GPE", "LOC"])
-
-def recommend_trips_with_ner(review_text: str, trips_df: pd.DataFrame):
-    locations = extract_locations(review_text)
-    trips_df["score"] = (
-        trips_df["Count of days"] * trips_df["Extra activities"].apply(len)
-        + trips_df["Cost in EUR"] / 100
-    )
+    return extract_locations_batch([text])[0]
 
-    if not locations:
-        filtered = trips_df.copy()
-    else:
-        filtered = trips_df[
-            trips_df["City"].isin(locations) | trips_df["Country"].isin(locations)
-        ]
+def extract_locations_batch(texts, batch_size: int = 256, n_process: int = 1):
+    docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=NER_DISABLED)
+    return [set(ent.text for ent in doc.ents if ent.label_ in ["GPE", "LOC"]) for doc in docs]
 
-    if len(filtered) < 3:
-        needed = 3 - len(filtered)
-        remaining = trips_df[~trips_df.index.isin(filtered.index)]
-        filler = remaining.sort_values(by="score", ascending=False).head(needed)
-        final = pd.concat([filtered, filler])
+def recommend_trips_with_ner(review_text: str, trip_index: TripIndex):
+    locations = extract_locations(review_text)
+    return trip_index.recommend(locations)
+
+@st.cache_resource
+def get_trip_index(trips_hash: str, _trips_df: pd.DataFrame) -> TripIndex:
+    return TripIndex(_trips_df)
+
+def build_results(df: pd.DataFrame, responses):
+    results = []
+    for row, response in zip(df.itertuples(index=False), responses):
+        try:
+            if isinstance(response, Exception):
+                raise response
+            predicted = "positive" if response["positive_sentiment"] else "negative"
+            reasoning = response["reasoning"]
+        except Exception as e:
+            predicted = "error"
+            reasoning = str(e)
+        results.append({
+            "review": row.review,
+            "true_sentiment": row.survey_sentiment,
+            "predicted_sentiment": predicted,
+            "reasoning": reasoning,
+            "score": row.customer_satisfaction_score
+        })
+    return results
+
+@st.cache_resource
+def get_local_classifier(model_path: str) -> LocalSentimentClassifier:
+    return LocalSentimentClassifier(model_path)
+
+def add_timing(timings, stage: str, start: float):
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+def classify_reviews(df: pd.DataFrame, max_concurrency: int = 8, max_retries: int = 2, progress_callback=None,
+                     packed: bool = False, token_budget: int = 4000, local_model=None,
+                     cascade_threshold: float = 0.9, timings=None):
+    items = [(row.review, row.customer_satisfaction_score) for row in df.itertuples(index=False)]
+    responses = [None] * len(items)
+    escalated = list(range(len(items)))
+
+    # Cascade: keep confident DistilBERT verdicts, send the rest to the LLM
+    if local_model is not None:
+        start = time.perf_counter()
+        probabilities = local_model.predict_proba([review for review, _ in items])
+        add_timing(timings, "local model", start)
+        confidences = probabilities.max(axis=1)
+        local_positive = probabilities.argmax(axis=1) == 1
+        escalated = [i for i in range(len(items)) if confidences[i] < cascade_threshold]
+        for i in range(len(items)):
+            if confidences[i] >= cascade_threshold:
+                responses[i] = {
+                    "positive_sentiment": bool(local_positive[i]),
+                    "reasoning": f"DistilBERT confidence {confidences[i]:.2f}"
+                }
+
+    llm_items = [items[i] for i in escalated]
+    start = time.perf_counter()
+    if packed:
+        llm_responses = classify_packed(
+            llm_items,
+            packed_sentiment_chain,
+            sentiment_chain,
+            token_budget=token_budget,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            progress_callback=progress_callback
+        )
     else:
-        final = filtered.sort_values(by="score", ascending=False).head(3)
-
-    selected_cols = [
-        "Country", "City", "Start date", "Count of days",
-        "Cost in EUR", "Extra activities", "Trip details"
+        llm_responses = run_chain_batch(
+            sentiment_chain,
+            [{"review": review, "score": score} for review, score in llm_items],
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            progress_callback=progress_callback
+        )
+    add_timing(timings, "LLM", start)
+    for i, response in zip(escalated, llm_responses):
+        responses[i] = response
+
+    results = build_results(df, responses)
+    if local_model is not None:
+        escalated_set = set(escalated)
+        for i, result in enumerate(results):
+            result["stage"] = "llm" if i in escalated_set else "local"
+            result["local_prediction"] = "positive" if local_positive[i] else "negative"
+    return results
+
+@st.cache_resource
+def get_draft_event_loop():
+    # ChatOpenAI keeps one async HTTP client per process, bound to the first loop it ran on,
+    # so every drafting run has to use the same long-lived loop (asyncio.run per rerun breaks it)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="draft-event-loop", daemon=True).start()
+    return loop
+
+def draft_customer_messages(results_df: pd.DataFrame, max_concurrency: int = 8, max_retries: int = 2,
+                            on_result=None):
+    rows_df = results_df[results_df["predicted_sentiment"].isin(["positive", "negative"])]
+    inputs = [
+        {"review": row.review, "positive_sentiment": row.predicted_sentiment == "positive"}
+        for row in rows_df.itertuples(index=False)
     ]
-    return final[selected_cols].to_dict(orient="records")
+    messages = [None] * len(inputs)
+    # Results are handed back to the script thread, which owns the Streamlit widgets
+    completed = queue.Queue()
+    done = object()
+
+    async def run():
+        try:
+            async for index, output in arun_chain_batch_as_completed(
+                response_chain, inputs, max_concurrency=max_concurrency, max_retries=max_retries
+            ):
+                completed.put((index, output))
+        finally:
+            completed.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(run(), get_draft_event_loop())
+    for item in iter(completed.get, done):
+        index, output = item
+        try:
+            if isinstance(output, Exception):
+                raise output
+            messages[index] = output["message"]
+        except Exception as e:
+            messages[index] = f"error: {e}"
+        if on_result:
+            on_result(rows_df, messages)
+    future.result()
+    return rows_df.assign(message=messages)
+
+@st.cache_data
+def messages_to_jsonl(messages_df: pd.DataFrame) -> bytes:
+    return messages_df.to_json(orient="records", lines=True, force_ascii=False).encode("utf-8")
+
+@st.cache_data
+def results_to_csv(results_df: pd.DataFrame) -> bytes:
+    return results_df.to_csv(index=False).encode("utf-8")
 
 def calc_metrics(results_df):
     filtered = results_df[results_df["predicted_sentiment"] != "error"]
@@ -123,29 +280,36 @@ def calc_metrics(results_df):
 
 # === Page Selection Interface ===
 st.sidebar.title("📑 Navigation")
-page = st.sidebar.radio("Choose a page:", ["🖼️ System diagram", "📊 Batch Sentiment Analysis", "💬 Individual Review Assistant"])
+page = st.sidebar.radio("Choose a page:", ["🖼️ System diagram", "📊 Batch Sentiment Analysis", "💬 Individual Review Assistant", "🧪 Packing Benchmark"])
 
 # === Shared data upload ===
 st.sidebar.header("📂 Upload Data")
-reviews_file = st.sidebar.file_uploader("Upload Customer Reviews (JSON)", type="json")
+reviews_file = st.sidebar.file_uploader("Upload Customer Reviews (JSON / JSONL)", type=["json", "jsonl"])
 trips_file = st.sidebar.file_uploader("Upload Trips Data (JSON)", type="json")
 
 # === Loading trip data ===
 trips_df = pd.DataFrame()
+trips_hash = None
 if trips_file is not None:
     try:
-        trips = json.load(io.StringIO(trips_file.getvalue().decode("utf-8")))
+        trips_bytes = trips_file.getvalue()
+        trips = json.load(io.StringIO(trips_bytes.decode("utf-8")))
         trips_df = pd.DataFrame(trips)
+        trips_hash = hashlib.sha256(trips_bytes).hexdigest()
     except json.JSONDecodeError as e:
         st.error(f"Error loading uploaded trips JSON: {e}")
 else:
     try:
-        with open("./trips_data.json", "r", encoding="utf-8") as f:
-            trips = json.load(f)
+        with open("./trips_data.json", "rb") as f:
+            trips_bytes = f.read()
+            trips = json.loads(trips_bytes.decode("utf-8"))
             trips_df = pd.DataFrame(trips)
+            trips_hash = hashlib.sha256(trips_bytes).hexdigest()
     except (FileNotFoundError, json.JSONDecodeError) as e:
         st.warning(f"Default trips file could not be loaded: {e}")
 
+trip_index = get_trip_index(trips_hash, trips_df) if not trips_df.empty else None
+
 # === Page 1: System Diagram ===
 if page == "🖼️ System diagram":
     st.title("🖼️ Sentiment Analysis + Travel Recommendations")
@@ -160,57 +324,201 @@ if page == "🖼️ System diagram":
 # === Page 2: Aggregate Review Analysis ===
 elif page == "📊 Batch Sentiment Analysis":
     st.title("📊 Sentiment Analysis + Travel Recommendations")
-    if reviews_file and not trips_df.empty:
-        df = pd.read_json(reviews_file)
 
+    st.sidebar.header("⚙️ Batch Settings")
+    max_concurrency = st.sidebar.slider("Max concurrent requests", min_value=1, max_value=32, value=8)
+    max_retries = st.sidebar.number_input("Retries per review", min_value=0, max_value=5, value=2)
+    packed_mode = st.sidebar.checkbox("Packed mode (many reviews per call)", value=False)
+    token_budget = st.sidebar.number_input("Token budget per packed call", min_value=500, max_value=32000, value=4000, step=500)
+    cascade_mode = st.sidebar.checkbox("Cascade mode (DistilBERT first, LLM for uncertain reviews)", value=False)
+    cascade_threshold = st.sidebar.slider("Escalation confidence threshold", min_value=0.5, max_value=1.0, value=0.9, step=0.01)
+    local_model_path = st.sidebar.text_input("DistilBERT model path", value="../notebooks/sentiment_classification_DistillBert")
+    ner_batch_size = st.sidebar.number_input("NER batch size", min_value=1, max_value=2048, value=256)
+    ner_processes = st.sidebar.number_input("NER processes", min_value=1, max_value=16, value=1)
+    chunk_size = st.sidebar.number_input("Reviews per chunk", min_value=10, max_value=5000, value=100)
+    # One-shot: the journal is reset on the next run only, not on every rerun
+    st.sidebar.button("Start fresh run (ignore checkpoints)",
+                      on_click=lambda: st.session_state.update(fresh_run_requested=True))
+    draft_messages = st.sidebar.checkbox("Draft customer messages for all reviews", value=False)
+
+    if reviews_file and not trips_df.empty:
         st.success("Files loaded successfully!")
 
+        st.subheader("📈 Classification Metrics")
+        metrics_placeholder = st.empty()
+        st.subheader("🔍 Detailed Results")
+        table_placeholder = st.empty()
+        progress_bar = st.progress(0.0, text="🔍 Analyzing sentiment...")
+
+        run_id = make_run_id(reviews_file.getvalue(), {
+            "packed": packed_mode,
+            "cascade": cascade_mode,
+            "cascade_threshold": cascade_threshold if cascade_mode else None,
+            "model": llm.model_name
+        })
+        if st.session_state.pop("fresh_run_requested", False):
+            run_journal.reset(run_id)
+        completed = run_journal.load(run_id)
+        if completed:
+            st.info(f"Resuming run `{run_id}`: {len(completed)} reviews already classified.")
+
+        local_model = get_local_classifier(local_model_path) if cascade_mode else None
+        timings = {}
+
         results = []
-        with st.spinner("🔍 Analyzing sentiment..."):
-            for row in df.itertuples(index=False):
-                try:
-                    response = sentiment_chain.invoke({
+        for chunk_df in iter_review_chunks(reviews_file, chunk_size=chunk_size):
+            processed = len(results)
+            keys = [review_key(row.review, row.customer_satisfaction_score) for row in chunk_df.itertuples(index=False)]
+            # Results are matched by row position: identical reviews in one chunk share a key
+            todo_positions = [i for i, key in enumerate(keys) if key not in completed]
+
+            new_results = classify_reviews(
+                chunk_df.iloc[todo_positions],
+                max_concurrency=max_concurrency,
+                max_retries=max_retries,
+                progress_callback=lambda done, total: progress_bar.progress(
+                    done / total, text=f"🔍 Analyzing sentiment... ({processed + done} reviews)"
+                ),
+                packed=packed_mode,
+                token_budget=token_budget,
+                local_model=local_model,
+                cascade_threshold=cascade_threshold,
+                timings=timings
+            )
+            new_by_position = dict(zip(todo_positions, new_results))
+
+            # Checkpoint successful rows; errors are retried on the next run
+            checkpoint = [
+                (keys[i], {k: v for k, v in result.items() if k not in ("review", "true_sentiment", "score")})
+                for i, result in new_by_position.items()
+                if result["predicted_sentiment"] != "error"
+            ]
+            run_journal.append(run_id, checkpoint)
+            completed.update(checkpoint)
+
+            for i, (key, row) in enumerate(zip(keys, chunk_df.itertuples(index=False))):
+                if i in new_by_position:
+                    results.append(new_by_position[i])
+                else:
+                    results.append({
                         "review": row.review,
+                        "true_sentiment": row.survey_sentiment,
+                        **completed[key],
                         "score": row.customer_satisfaction_score
                     })
-                    predicted = "positive" if response["positive_sentiment"] else "negative"
-                    reasoning = response["reasoning"]
-                except Exception as e:
-                    predicted = "error"
-                    reasoning = str(e)
-                results.append({
-                    "review": row.review,
-                    "true_sentiment": row.survey_sentiment,
-                    "predicted_sentiment": predicted,
-                    "reasoning": reasoning,
-                    "score": row.customer_satisfaction_score
-                })
 
+            start = time.perf_counter()
+            results_df = pd.DataFrame(results)
+            if (results_df["predicted_sentiment"] != "error").any():
+                acc, prec, rec = calc_metrics(results_df)
+                with metrics_placeholder.container():
+                    st.write(f"**Accuracy:** {acc:.2f}")
+                    st.write(f"**Precision:** {prec:.2f}")
+                    st.write(f"**Recall:** {rec:.2f}")
+            table_placeholder.dataframe(results_df[["review", "true_sentiment", "predicted_sentiment", "reasoning"]])
+            add_timing(timings, "progress updates", start)
+        progress_bar.empty()
+
+        if not results:
+            st.warning("The uploaded reviews file does not contain any reviews.")
+            st.stop()
         results_df = pd.DataFrame(results)
-        acc, prec, rec = calc_metrics(results_df)
-
-        st.subheader("📈 Classification Metrics")
-        st.write(f"**Accuracy:** {acc:.2f}")
-        st.write(f"**Precision:** {prec:.2f}")
-        st.write(f"**Recall:** {rec:.2f}")
-
-        result_column = []
-        for row in results_df.itertuples(index=False):
-            if row.predicted_sentiment == "negative":
-                result_column.append("13% discount")
-            elif row.predicted_sentiment == "positive":
-                recs = recommend_trips_with_ner(row.review, trips_df)
-                result_column.append(", ".join([trip["City"] for trip in recs]))
-            else:
-                result_column.append("unable to classify")
-
-        results_df["recommendation/discount"] = result_column
-
-        st.subheader("🔍 Detailed Results")
-        st.dataframe(results_df[["review", "true_sentiment", "predicted_sentiment", "reasoning", "recommendation/discount"]])
 
-        csv = results_df.to_csv(index=False).encode("utf-8")
-        st.download_button("📥 Download Results as CSV", csv, file_name="sentiment_results.csv", mime="text/csv")
+        if cascade_mode and "local_prediction" in results_df:
+            st.subheader("⚡ Cascade Statistics")
+            escalated_count = int((results_df["stage"] == "llm").sum())
+            local_count = int((results_df["stage"] == "local").sum())
+            stat_cols = st.columns(3)
+            stat_cols[0].metric("Escalation rate", f"{escalated_count / len(results_df):.0%}")
+            stat_cols[1].metric(
+                "Local model latency",
+                f"{timings.get('local model', 0.0):.1f} s",
+                help=f"{1000 * timings.get('local model', 0.0) / max(len(results_df), 1):.1f} ms per scored review"
+            )
+            stat_cols[2].metric(
+                "LLM latency",
+                f"{timings.get('LLM', 0.0):.1f} s",
+                help=f"{1000 * timings.get('LLM', 0.0) / max(escalated_count, 1):.1f} ms per escalated review"
+            )
+
+            local_df = results_df.dropna(subset=["local_prediction"]).assign(
+                predicted_sentiment=lambda d: d["local_prediction"]
+            )
+            if not local_df.empty:
+                cascade_metrics = calc_metrics(results_df)
+                local_metrics = calc_metrics(local_df)
+                metric_cols = st.columns(3)
+                for col, name, cascade_value, local_value in zip(
+                    metric_cols, ["Accuracy", "Precision", "Recall"], cascade_metrics, local_metrics
+                ):
+                    col.metric(name, f"{cascade_value:.2f}", delta=f"{cascade_value - local_value:+.2f} vs DistilBERT only")
+            st.caption(f"{local_count} reviews answered locally, {escalated_count} escalated to the LLM.")
+
+        positive_mask = results_df["predicted_sentiment"] == "positive"
+        negative_mask = results_df["predicted_sentiment"] == "negative"
+
+        with st.spinner("📍 Extracting locations..."):
+            start = time.perf_counter()
+            positive_locations = extract_locations_batch(
+                results_df.loc[positive_mask, "review"].tolist(), batch_size=ner_batch_size, n_process=ner_processes
+            )
+            add_timing(timings, "NER", start)
+
+        start = time.perf_counter()
+        results_df["recommendation/discount"] = "unable to classify"
+        results_df.loc[negative_mask, "recommendation/discount"] = "13% discount"
+        results_df.loc[positive_mask, "recommendation/discount"] = [
+            ", ".join(trip["City"] for trip in recs) for recs in trip_index.recommend_many(positive_locations)
+        ]
+        add_timing(timings, "recommendations", start)
+
+        table_placeholder.dataframe(results_df[["review", "true_sentiment", "predicted_sentiment", "reasoning", "recommendation/discount"]])
+
+        st.download_button(
+            "📥 Download Results as CSV",
+            lambda: results_to_csv(results_df),
+            file_name="sentiment_results.csv",
+            mime="text/csv"
+        )
+
+        if draft_messages:
+            st.subheader("✉️ Drafted Customer Messages")
+            messages_placeholder = st.empty()
+            last_update = [0.0]
+
+            def show_messages(rows_df, messages, force=False):
+                # Redraw at most a few times per second while results stream in
+                if force or time.perf_counter() - last_update[0] > 0.5:
+                    messages_placeholder.dataframe(rows_df.assign(message=messages)[["review", "predicted_sentiment", "message"]])
+                    last_update[0] = time.perf_counter()
+
+            with st.spinner("✍️ Drafting messages..."):
+                start = time.perf_counter()
+                messages_df = draft_customer_messages(
+                    results_df, max_concurrency=max_concurrency, max_retries=max_retries, on_result=show_messages
+                )
+                add_timing(timings, "message drafting", start)
+            show_messages(messages_df, messages_df["message"], force=True)
+
+            download_cols = st.columns(2)
+            download_cols[0].download_button(
+                "📥 Download Messages as CSV",
+                lambda: results_to_csv(messages_df),
+                file_name="customer_messages.csv",
+                mime="text/csv"
+            )
+            download_cols[1].download_button(
+                "📥 Download Messages as JSONL",
+                lambda: messages_to_jsonl(messages_df),
+                file_name="customer_messages.jsonl",
+                mime="application/jsonl"
+            )
+
+        with st.expander("⏱️ Stage timings"):
+            st.dataframe(pd.DataFrame([
+                {"stage": stage, "seconds": seconds, "ms per review": 1000 * seconds / len(results_df)}
+                for stage, seconds in timings.items()
+            ]))
     else:
         st.warning("Please upload both the reviews and trips data to proceed.")
 
@@ -236,21 +544,24 @@ elif page == "💬 Individual Review Assistant":
 
             if is_positive:
                 response = positive_chain.invoke({"review": user_review})
-                recs = recommend_trips_with_ner(user_review, trips_df)
 
                 st.subheader("💌 GPT-generated Response to Customer")
                 st.text_area("Response", response["message"], height=150)
 
                 st.subheader("🌍 Recommended Trips")
-                for idx, trip in enumerate(recs, 1):
-                    with st.expander(f"🧳 Trip {idx}: {trip['Country']} - {trip['City']} ({trip['Start date']})"):
-                        st.write(f"**Country:** {trip['Country']}")
-                        st.write(f"**City:** {trip['City']}")
-                        st.write(f"**Start date:** {trip['Start date']}")
-                        st.write(f"**Duration:** {trip['Count of days']} days")
-                        st.write(f"**Cost:** €{trip['Cost in EUR']}")
-                        st.write(f"**Extra activities:** {', '.join(trip['Extra activities'])}")
-                        st.write(f"**Trip details:** {trip['Trip details']}")
+                if trip_index is not None:
+                    recs = recommend_trips_with_ner(user_review, trip_index)
+                    for idx, trip in enumerate(recs, 1):
+                        with st.expander(f"🧳 Trip {idx}: {trip['Country']} - {trip['City']} ({trip['Start date']})"):
+                            st.write(f"**Country:** {trip['Country']}")
+                            st.write(f"**City:** {trip['City']}")
+                            st.write(f"**Start date:** {trip['Start date']}")
+                            st.write(f"**Duration:** {trip['Count of days']} days")
+                            st.write(f"**Cost:** €{trip['Cost in EUR']}")
+                            st.write(f"**Extra activities:** {', '.join(trip['Extra activities'])}")
+                            st.write(f"**Trip details:** {trip['Trip details']}")
+                else:
+                    st.warning("Please upload the trips data to get trip recommendations.")
             else:
                 response = negative_chain.invoke({"review": user_review})
                 st.subheader("🙏 GPT-generated Apology Message")
@@ -258,3 +569,71 @@ elif page == "💬 Individual Review Assistant":
                 st.write("💸 Offer: **13% discount** for next visit")
         else:
             st.warning("Please enter some review text before clicking analyze.")
+
+# === Page 4: Packing Benchmark ===
+elif page == "🧪 Packing Benchmark":
+    st.title("🧪 Packed vs Single-Review Classification")
+    st.markdown(
+        "Classifies the same sample once with one LLM call per review and once in packed mode. "
+        "The LLM cache is bypassed so both modes pay for every call."
+    )
+    sample_size = st.slider("Reviews to benchmark", min_value=10, max_value=500, value=50)
+    token_budget = st.slider("Token budget per packed call", min_value=1000, max_value=16000, value=4000, step=500)
+    max_concurrency = st.slider("Max concurrent requests", min_value=1, max_value=32, value=8)
+
+    if reviews_file:
+        if st.button("▶️ Run benchmark"):
+            sample_df = pd.DataFrame(list(islice(iter_review_records(reviews_file), sample_size)))
+            items = [(row.review, row.customer_satisfaction_score) for row in sample_df.itertuples(index=False)]
+            uncached_sentiment_chain = sentiment_prompt | llm | sentiment_parser
+
+            benchmark_rows = []
+            for mode in ["single", "packed"]:
+                with st.spinner(f"Running {mode} mode..."), get_usage_metadata_callback() as usage_callback:
+                    start = time.perf_counter()
+                    if mode == "single":
+                        responses = run_chain_batch(
+                            uncached_sentiment_chain,
+                            [{"review": review, "score": score} for review, score in items],
+                            max_concurrency=max_concurrency
+                        )
+                    else:
+                        responses = classify_packed(
+                            items,
+                            packed_sentiment_chain,
+                            uncached_sentiment_chain,
+                            token_budget=token_budget,
+                            max_concurrency=max_concurrency
+                        )
+                    elapsed = time.perf_counter() - start
+
+                usage = usage_callback.usage_metadata.values()
+                input_tokens = sum(u["input_tokens"] for u in usage)
+                output_tokens = sum(u["output_tokens"] for u in usage)
+                mode_df = pd.DataFrame(build_results(sample_df, responses))
+                acc, prec, rec = calc_metrics(mode_df)
+                benchmark_rows.append({
+                    "mode": mode,
+                    "reviews": len(mode_df),
+                    "errors": int((mode_df["predicted_sentiment"] == "error").sum()),
+                    "input tokens / review": input_tokens / len(mode_df),
+                    "output tokens / review": output_tokens / len(mode_df),
+                    "reviews / second": len(mode_df) / elapsed,
+                    "accuracy": acc,
+                    "precision": prec,
+                    "recall": rec
+                })
+
+            st.subheader("📈 Benchmark Results")
+            st.dataframe(pd.DataFrame(benchmark_rows))
+    else:
+        st.warning("Please upload the reviews data to run the benchmark.")
+
+
+# === LLM cache statistics ===
+st.sidebar.header("🗄️ LLM Cache")
+cache_stats = llm_cache.stats()
+st.sidebar.write(f"**Hits:** {cache_stats['hits']} | **Misses:** {cache_stats['misses']} | **Entries:** {cache_stats['entries']}")
+if st.sidebar.button("Clear LLM cache"):
+    llm_cache.clear()
+    st.rerun()
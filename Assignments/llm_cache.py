@@ -0,0 +1,182 @@
+"""
+Persistent response cache for LLM chains.
+
+This module provides helper functions for:
+- Content-addressed caching of chain outputs in a local SQLite file
+- TTL expiry and size-based LRU eviction of cached entries
+- Wrapping LCEL chains so repeated inputs never reach the model
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize numpy scalars (e.g. scores from a DataFrame) as plain Python values."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class LLMCache:
+    """SQLite-backed key/value store for chain outputs."""
+
+    def __init__(
+        self,
+        path: str = "llm_cache.sqlite",
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        max_size_bytes: int = 50 * 1024 * 1024
+    ):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: Location of the SQLite file
+            ttl_seconds: Entries older than this are treated as misses (None disables expiry)
+            max_size_bytes: Least recently used entries are evicted above this total size
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(template: str, model: str, temperature: Any, inputs: Dict[str, Any]) -> str:
+        """
+        Build a content hash for one chain call.
+
+        Args:
+            template: Prompt template text
+            model: Model name
+            temperature: Sampling temperature
+            inputs: Input variables passed to the chain
+
+        Returns:
+            Hex SHA-256 digest identifying the call
+        """
+        payload = json.dumps(
+            {"template": template, "model": model, "temperature": temperature, "inputs": inputs},
+            sort_keys=True,
+            default=_json_default
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """Store a value and evict least recently used entries if the cache is too large."""
+        data = json.dumps(value, default=_json_default)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Delete oldest-accessed entries until the total size fits in max_size_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        excess = total - self.max_size_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY last_access"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", stale_keys)
+
+    def clear(self):
+        """Remove all entries and reset the hit/miss counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of stored entries."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+def with_cache(chain: Runnable, prompt: Any, llm: Any, cache: LLMCache) -> Runnable:
+    """
+    Wrap an LCEL chain so that identical calls are answered from the cache.
+
+    Args:
+        chain: The chain to wrap, e.g. `sentiment_prompt | llm | sentiment_parser`
+        prompt: Prompt template used by the chain (its text is part of the key)
+        llm: Chat model used by the chain (model name and temperature are part of the key)
+        cache: LLMCache instance
+
+    Returns:
+        Runnable with the same input/output as `chain`
+    """
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", "")
+    temperature = getattr(llm, "temperature", None)
+
+    def invoke_cached(inputs: Dict[str, Any], config: RunnableConfig) -> Any:
+        key = cache.make_key(prompt.template, model, temperature, inputs)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        output = chain.invoke(inputs, config)
+        cache.set(key, output)
+        return output
+
+    async def ainvoke_cached(inputs: Dict[str, Any], config: RunnableConfig) -> Any:
+        key = cache.make_key(prompt.template, model, temperature, inputs)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        output = await chain.ainvoke(inputs, config)
+        cache.set(key, output)
+        return output
+
+    return RunnableLambda(invoke_cached, afunc=ainvoke_cached)
@@ -0,0 +1,70 @@
+"""
+Local DistilBERT sentiment classifier for the cascade mode.
+
+This module provides helper functions for:
+- Loading the model fine-tuned in W1-Sentiment_classification_with_BERT.ipynb
+- Scoring reviews on CPU in batches
+- Returning softmax confidences so uncertain reviews can be escalated to the LLM
+"""
+
+from typing import List
+
+import numpy as np
+import torch
+from transformers import DistilBertForSequenceClassification, DistilBertTokenizerFast
+
+
+class LocalSentimentClassifier:
+    """Batch inference wrapper around the saved `sentiment_classification_DistillBert` model."""
+
+    def __init__(
+        self,
+        model_path: str = "../notebooks/sentiment_classification_DistillBert",
+        tokenizer_name: str = "distilbert-base-uncased",
+        max_length: int = 128,
+        device: str = "cpu"
+    ):
+        """
+        Load the model and tokenizer.
+
+        Args:
+            model_path: Directory written by `model.save_pretrained(...)` in the W1 notebook
+            tokenizer_name: Tokenizer used during fine-tuning (not saved with the model)
+            max_length: Maximum number of tokens per review (same as in training)
+            device: Torch device to run inference on
+        """
+        self.device = device
+        self.max_length = max_length
+        self.tokenizer = DistilBertTokenizerFast.from_pretrained(tokenizer_name)
+        self.model = DistilBertForSequenceClassification.from_pretrained(model_path)
+        self.model.to(device)
+        self.model.eval()
+
+    def predict_proba(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Score reviews in batches.
+
+        Args:
+            texts: Review texts
+            batch_size: Number of reviews per forward pass
+
+        Returns:
+            Array of shape (len(texts), 2) with [negative, positive] probabilities
+        """
+        probabilities = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                encoded = self.tokenizer(
+                    texts[start:start + batch_size],
+                    return_tensors="pt",
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length
+                )
+                inputs = {k: v.to(self.device) for k, v in encoded.items()}
+                logits = self.model(**inputs).logits
+                probabilities.append(torch.nn.functional.softmax(logits, dim=-1).cpu().numpy())
+
+        if not probabilities:
+            return np.empty((0, 2))
+        return np.concatenate(probabilities)
@@ -0,0 +1,205 @@
+"""
+Packed sentiment classification: many reviews per LLM call.
+
+This module provides helper functions for:
+- Measuring prompt size with tiktoken
+- Packing reviews into prompts that fit a token budget
+- Validating the returned JSON array and falling back to single-review calls
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import tiktoken
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
+
+from batch_engine import run_chain_batch
+
+packed_sentiment_prompt = PromptTemplate(
+    template="""
+You are a sentiment analysis expert.
+
+Below is a list of customer reviews, one JSON object per line with an id,
+the customer satisfaction score (1–5) and the review text.
+For every review decide whether the overall sentiment is positive or negative.
+
+Reviews:
+{reviews}
+
+Return a valid JSON array with exactly one object per review, in this format:
+[
+  {{
+    "id": integer,
+    "positive_sentiment": boolean,
+    "reasoning": string
+  }}
+]
+
+Make sure your response is valid JSON.
+""",
+    input_variables=["reviews"]
+)
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Count tokens of a text with the tokenizer used by `model`."""
+    return len(_get_encoding(model).encode(text))
+
+
+def _format_review(item_id: int, review: str, score: Any) -> str:
+    if hasattr(score, "item"):
+        score = score.item()
+    return json.dumps({"id": item_id, "score": score, "review": review}, ensure_ascii=False)
+
+
+def pack_reviews(
+    items: Sequence[Tuple[str, Any]],
+    token_budget: int = 4000,
+    max_per_pack: int = 40,
+    output_tokens_per_review: int = 60,
+    model: str = "gpt-4o"
+) -> List[List[int]]:
+    """
+    Group reviews into packs whose prompt and expected output fit `token_budget`.
+
+    Args:
+        items: (review, score) pairs
+        token_budget: Maximum tokens per request (prompt plus reserved output)
+        max_per_pack: Upper bound on reviews per pack
+        output_tokens_per_review: Output tokens reserved for each review's verdict
+        model: Model name used to pick the tokenizer
+
+    Returns:
+        List of packs, each a list of indices into `items`
+    """
+    overhead = count_tokens(packed_sentiment_prompt.format(reviews=""), model)
+    packs: List[List[int]] = []
+    current: List[int] = []
+    used = overhead
+
+    for index, (review, score) in enumerate(items):
+        cost = count_tokens(_format_review(index, review, score), model) + output_tokens_per_review
+        if current and (used + cost > token_budget or len(current) >= max_per_pack):
+            packs.append(current)
+            current, used = [], overhead
+        # A single review over budget still gets its own pack
+        current.append(index)
+        used += cost
+
+    if current:
+        packs.append(current)
+    return packs
+
+
+def parse_packed_response(response: Any, expected_ids: Sequence[int]) -> Dict[int, dict]:
+    """
+    Validate a packed response and keep only well-formed verdicts.
+
+    Args:
+        response: Parsed JSON returned by the packed chain
+        expected_ids: IDs sent in the pack
+
+    Returns:
+        Dictionary mapping review ID to {"positive_sentiment", "reasoning"}
+    """
+    if not isinstance(response, list):
+        return {}
+
+    expected = set(expected_ids)
+    verdicts: Dict[int, dict] = {}
+    for item in response:
+        if not isinstance(item, dict):
+            continue
+        item_id = item.get("id")
+        if (
+            isinstance(item_id, int)
+            and item_id in expected
+            and isinstance(item.get("positive_sentiment"), bool)
+            and isinstance(item.get("reasoning"), str)
+        ):
+            verdicts[item_id] = {
+                "positive_sentiment": item["positive_sentiment"],
+                "reasoning": item["reasoning"]
+            }
+    return verdicts
+
+
+def classify_packed(
+    items: Sequence[Tuple[str, Any]],
+    packed_chain: Runnable,
+    single_chain: Runnable,
+    token_budget: int = 4000,
+    max_per_pack: int = 40,
+    max_concurrency: int = 8,
+    max_retries: int = 2,
+    model: str = "gpt-4o",
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> List[Any]:
+    """
+    Classify reviews in packs, re-sending unparsed items one by one.
+
+    Args:
+        items: (review, score) pairs
+        packed_chain: Chain built on `packed_sentiment_prompt` returning a JSON array
+        single_chain: One-review chain (e.g. `sentiment_chain`) used as fallback
+        token_budget: Maximum tokens per packed request
+        max_per_pack: Upper bound on reviews per pack
+        max_concurrency: Maximum number of requests running at the same time
+        max_retries: Number of retries per request after the first attempt
+        model: Model name used to pick the tokenizer
+        progress_callback: Optional function called with (done, total) reviews
+
+    Returns:
+        List in input order of {"positive_sentiment", "reasoning"} dictionaries,
+        or the raised Exception for reviews that failed in both modes
+    """
+    total = len(items)
+    packs = pack_reviews(items, token_budget=token_budget, max_per_pack=max_per_pack, model=model)
+    pack_inputs = [
+        {"reviews": "\n".join(_format_review(i, *items[i]) for i in pack)}
+        for pack in packs
+    ]
+
+    def report_packs(done_packs: int, total_packs: int):
+        if progress_callback:
+            progress_callback(round(done_packs / total_packs * total), total)
+
+    responses = run_chain_batch(
+        packed_chain,
+        pack_inputs,
+        max_concurrency=max_concurrency,
+        max_retries=max_retries,
+        progress_callback=report_packs
+    )
+
+    results: List[Any] = [None] * total
+    for pack, response in zip(packs, responses):
+        if isinstance(response, Exception):
+            continue
+        for item_id, verdict in parse_packed_response(response, pack).items():
+            results[item_id] = verdict
+
+    fallback = [i for i in range(total) if results[i] is None]
+    if fallback:
+        fallback_responses = run_chain_batch(
+            single_chain,
+            [{"review": items[i][0], "score": items[i][1]} for i in fallback],
+            max_concurrency=max_concurrency,
+            max_retries=max_retries
+        )
+        for i, response in zip(fallback, fallback_responses):
+            results[i] = response
+
+    if progress_callback:
+        progress_callback(total, total)
+    return results
@@ -0,0 +1,117 @@
+"""
+Streaming readers for large review uploads.
+
+This module provides helper functions for:
+- Incrementally parsing a top-level JSON array without loading the whole file
+- Reading JSON Lines files record by record
+- Grouping records into fixed-size DataFrame chunks
+"""
+
+import codecs
+import json
+from typing import IO, Iterator, List
+
+import pandas as pd
+
+READ_SIZE = 64 * 1024
+
+
+def _iter_json_array(file: IO[bytes], first_text: str, decoder: codecs.IncrementalDecoder) -> Iterator[dict]:
+    """Yield the items of a JSON array, reading `file` in READ_SIZE blocks."""
+    json_decoder = json.JSONDecoder()
+    buffer = first_text.lstrip()[1:]  # drop the opening '['
+    pos = 0
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between items
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+
+        if pos < len(buffer):
+            try:
+                item, end = json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # A value ending exactly at the buffer edge (e.g. a number) may be cut off
+                if end < len(buffer) or eof:
+                    yield item
+                    pos = end
+                    continue
+
+        if eof:
+            raise json.JSONDecodeError("Unterminated JSON array", buffer, pos)
+
+        block = file.read(READ_SIZE)
+        eof = not block
+        buffer = buffer[pos:] + decoder.decode(block, final=eof)
+        pos = 0
+
+
+def _iter_json_lines(file: IO[bytes], first_text: str, decoder: codecs.IncrementalDecoder) -> Iterator[dict]:
+    """Yield one record per non-empty line of a JSON Lines file."""
+    pending = first_text
+    while True:
+        block = file.read(READ_SIZE)
+        pending += decoder.decode(block, final=not block)
+        lines = pending.split("\n")
+        pending = lines.pop() if block else ""
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        if not block:
+            return
+
+
+def iter_review_records(file: IO[bytes]) -> Iterator[dict]:
+    """
+    Stream review records from an uploaded file.
+
+    The format is detected from the first non-whitespace character: '[' means
+    a JSON array, anything else is read as JSON Lines.
+
+    Args:
+        file: Binary file-like object (e.g. a Streamlit UploadedFile)
+
+    Returns:
+        Iterator over review dictionaries
+    """
+    file.seek(0)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    first_text = ""
+    while not first_text.strip():
+        block = file.read(READ_SIZE)
+        if not block:
+            return
+        first_text += decoder.decode(block)
+
+    if first_text.lstrip().startswith("["):
+        yield from _iter_json_array(file, first_text, decoder)
+    else:
+        yield from _iter_json_lines(file, first_text, decoder)
+
+
+def iter_review_chunks(file: IO[bytes], chunk_size: int = 100) -> Iterator[pd.DataFrame]:
+    """
+    Stream review records as DataFrames of at most `chunk_size` rows.
+
+    Args:
+        file: Binary file-like object with a JSON array or JSON Lines content
+        chunk_size: Number of reviews per chunk
+
+    Returns:
+        Iterator over DataFrame chunks
+    """
+    chunk: List[dict] = []
+    for record in iter_review_records(file):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk)
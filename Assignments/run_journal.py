@@ -0,0 +1,103 @@
+"""
+Run journal for resumable batch sentiment runs.
+
+This module provides helper functions for:
+- Identifying a batch run and its reviews by content hash
+- Appending finished rows to an on-disk SQLite journal, one checkpoint per chunk
+- Loading completed rows so an interrupted run can skip them on restart
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Tuple
+
+
+def make_run_id(file_bytes: bytes, settings: Dict[str, Any] = None) -> str:
+    """
+    Derive a run ID from the uploaded reviews file and the classification settings.
+
+    Re-uploading the same file with the same settings resumes the same run; changing
+    a setting that affects the predictions (mode, threshold, model) starts a new one.
+    """
+    digest = hashlib.sha256(file_bytes)
+    if settings:
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def review_key(review: str, score: Any) -> str:
+    """Hash a review and its satisfaction score into a journal key."""
+    if hasattr(score, "item"):
+        score = score.item()
+    payload = json.dumps({"review": review, "score": score}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RunJournal:
+    """Append-only SQLite journal of classified reviews, grouped by run ID."""
+
+    def __init__(self, path: str = "run_journal.sqlite"):
+        """
+        Open (or create) the journal database.
+
+        Args:
+            path: Location of the SQLite file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS journal (
+                run_id TEXT NOT NULL,
+                review_key TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (run_id, review_key)
+            )"""
+        )
+        self._conn.commit()
+
+    def load(self, run_id: str) -> Dict[str, dict]:
+        """
+        Load every completed row of a run.
+
+        Args:
+            run_id: ID returned by `make_run_id`
+
+        Returns:
+            Dictionary mapping review key to the stored result
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT review_key, result FROM journal WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {key: json.loads(result) for key, result in rows}
+
+    def append(self, run_id: str, rows: Iterable[Tuple[str, dict]]):
+        """
+        Checkpoint a group of finished rows in a single transaction.
+
+        Args:
+            run_id: ID returned by `make_run_id`
+            rows: (review key, result dictionary) pairs
+        """
+        now = time.time()
+        records = [(run_id, key, json.dumps(result), now) for key, result in rows]
+        if not records:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO journal (run_id, review_key, result, created_at) VALUES (?, ?, ?, ?)",
+                records
+            )
+            self._conn.commit()
+
+    def reset(self, run_id: str):
+        """Forget all completed rows of a run."""
+        with self._lock:
+            self._conn.execute("DELETE FROM journal WHERE run_id = ?", (run_id,))
+            self._conn.commit()
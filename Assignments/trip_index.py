@@ -0,0 +1,100 @@
+"""
+Precomputed trip index for location-based recommendations.
+
+This module provides helper functions for:
+- Scoring all trips once with vectorized pandas operations
+- Looking up trips by city or country through an inverted index
+- Serving a presorted global top-N list when too few trips match
+"""
+
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+SELECTED_COLUMNS = [
+    "Country", "City", "Start date", "Count of days",
+    "Cost in EUR", "Extra activities", "Trip details"
+]
+
+
+class TripIndex:
+    """Read-only index over the trips table, built once per uploaded trips file."""
+
+    def __init__(self, trips_df: pd.DataFrame, top_k: int = 3):
+        """
+        Build the index.
+
+        Args:
+            trips_df: Trips table with the columns from `trips_data.json`
+            top_k: Number of trips returned per recommendation
+        """
+        self.top_k = top_k
+        self.trips_df = trips_df.reset_index(drop=True).copy()
+        self.trips_df["score"] = (
+            self.trips_df["Count of days"] * self.trips_df["Extra activities"].str.len()
+            + self.trips_df["Cost in EUR"] / 100
+        )
+
+        # Row positions ordered by score (best first); ties keep file order
+        order = np.argsort(-self.trips_df["score"].to_numpy(), kind="stable")
+        self._rank = np.empty(len(order), dtype=np.int64)
+        self._rank[order] = np.arange(len(order))
+        # Matches can only displace up to top_k - 1 fallback rows
+        self._global_top: List[int] = order[: 2 * top_k].tolist()
+
+        self._location_index: Dict[str, List[int]] = {}
+        for column in ("City", "Country"):
+            for position, value in enumerate(self.trips_df[column]):
+                self._location_index.setdefault(value, []).append(position)
+
+        self._records = self.trips_df[SELECTED_COLUMNS].to_dict(orient="records")
+
+    def recommend(self, locations: Iterable[str]) -> List[dict]:
+        """
+        Recommend trips for the locations mentioned in a review.
+
+        Trips in a mentioned city or country come first. If fewer than `top_k`
+        match, the best-scoring remaining trips fill the list.
+
+        Args:
+            locations: City or country names extracted from the review
+
+        Returns:
+            List of up to `top_k` trip dictionaries
+        """
+        matches = sorted({
+            position
+            for location in locations
+            for position in self._location_index.get(location, ())
+        })
+
+        if len(matches) >= self.top_k:
+            chosen = sorted(matches, key=lambda position: self._rank[position])[: self.top_k]
+        else:
+            matched = set(matches)
+            filler = [position for position in self._global_top if position not in matched]
+            chosen = matches + filler[: self.top_k - len(matches)]
+
+        return [self._records[position] for position in chosen]
+
+    def recommend_many(self, location_sets: Sequence[Iterable[str]]) -> List[List[dict]]:
+        """
+        Recommend trips for many reviews at once.
+
+        Reviews mentioning the same set of locations share a single lookup.
+
+        Args:
+            location_sets: Locations extracted from each review
+
+        Returns:
+            List of recommendations, one per location set
+        """
+        by_locations: Dict[frozenset, List[dict]] = {}
+        recommendations = []
+        for locations in location_sets:
+            key = frozenset(locations)
+            if key not in by_locations:
+                by_locations[key] = self.recommend(key)
+            recommendations.append(by_locations[key])
+        return recommendations
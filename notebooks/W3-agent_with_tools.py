@@ -1,28 +1,36 @@
-import os
+import argparse
+import asyncio
+import threading
+import time
 import uuid
-import pandas as pd
-import csv
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, message_chunk_to_message
+
+from W3_reservation_store import get_reservation_store
+from W3_tool_cache import ToolResultCache
+from W3_agent_trace import AgentTracer, format_summary, message_list_size
+from W3_agent_context import AgentContext
+from W3_agent_replay import format_replay_report, load_queries, replay_queries
 
 from dotenv import load_dotenv
 load_dotenv()
 
 llm = ChatOpenAI(temperature=0, model_name="gpt-4o", streaming=False)
 
-# File path for our mock database
-RESERVATIONS_FILE = "reservations.csv"
+# Mock database: reservations.csv by default, or an indexed SQLite store
+# (set RESERVATIONS_BACKEND=sqlite, see W3_reservation_store.py)
+reservation_store = get_reservation_store()
 
-# Initialize the CSV file if it doesn't exist
-def initialize_csv():
-    if not os.path.exists(RESERVATIONS_FILE):
-        with open(RESERVATIONS_FILE, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(["reservation_id", "reservation_date", "planned_trip_date",
-                             "trip_destination", "description"])
+# Results of idempotent (read-only) tools are memoized across sessions in this
+# process; write tools invalidate the keys they affect, and keys include the store's
+# version so bookings saved by other processes are seen too
+tool_cache = ToolResultCache(max_size=1024, version=reservation_store.version)
 
 # Tool to save a reservation
 @tool
@@ -38,23 +46,27 @@ def save_reservation(planned_trip_date: str, trip_destination: str, description:
     Returns:
         A confirmation message with the reservation ID
     """
-    initialize_csv()
-
     # Generate a unique reservation ID
     reservation_id = str(uuid.uuid4())[:8]
     reservation_date = datetime.now().strftime('%Y-%m-%d')
 
-    # Save to CSV
-    with open(RESERVATIONS_FILE, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([reservation_id, reservation_date, planned_trip_date,
-                         trip_destination, description])
-    print(f"Saved reservation to CSV: {RESERVATIONS_FILE}")
+    reservation_store.save({
+        "reservation_id": reservation_id,
+        "reservation_date": reservation_date,
+        "planned_trip_date": planned_trip_date,
+        "trip_destination": trip_destination,
+        "description": description
+    })
+    print(f"Saved reservation to {type(reservation_store).__name__}: {reservation_store.path}")
+    # A lookup of this ID may have cached "No reservation found"
+    tool_cache.invalidate("read_reservation", reservation_id=reservation_id)
+    tool_cache.invalidate("search_reservations")
 
     return f"Reservation created successfully! Your reservation ID is: {reservation_id}"
 
 # Tool to read a reservation
 @tool
+@tool_cache.idempotent(should_cache=lambda result: not result.startswith("Error"))
 def read_reservation(reservation_id: str) -> str:
     """
     Look up a reservation by ID.
@@ -65,25 +77,90 @@ def read_reservation(reservation_id: str) -> str:
     Returns:
         Details of the reservation or an error message if not found
     """
-    initialize_csv()
-
     try:
-        df = pd.read_csv(RESERVATIONS_FILE)
-        reservation = df[df['reservation_id'] == reservation_id]
+        res = reservation_store.get(reservation_id)
 
-        if reservation.empty:
+        if res is None:
             return f"No reservation found with ID: {reservation_id}"
 
-        # Get the first (and should be only) matching reservation
-        res = reservation.iloc[0]
         return f"Reservation found:\nID: {res['reservation_id']}\nBooked on: {res['reservation_date']}\nTrip date: {res['planned_trip_date']}\nDestination: {res['trip_destination']}\nDetails: {res['description']}"
 
     except Exception as e:
         return f"Error looking up reservation: {str(e)}"
 
 
+SEARCH_PAGE_SIZE = 20
+
+# Tool to search reservations
+@tool
+@tool_cache.idempotent(should_cache=lambda result: not result.startswith("Error"))
+def search_reservations(
+    destination: str = "",
+    trip_date_from: str = "",
+    trip_date_to: str = "",
+    booked_from: str = "",
+    booked_to: str = "",
+    page: int = 1
+) -> str:
+    """
+    Search reservations by destination, trip date range and booking date range.
+    Results are paginated (20 per page) and include the total number of matches.
+
+    Args:
+        destination: Start of the destination, case-insensitive ("paris" matches "Paris, France"); empty for any
+        trip_date_from: Earliest planned trip date, YYYY-MM-DD (inclusive); empty for no limit
+        trip_date_to: Latest planned trip date, YYYY-MM-DD (inclusive); empty for no limit
+        booked_from: Earliest booking date, YYYY-MM-DD (inclusive); empty for no limit
+        booked_to: Latest booking date, YYYY-MM-DD (inclusive); empty for no limit
+        page: Page number, starting at 1
+
+    Returns:
+        The total number of matches and one page of reservations, one per line
+    """
+    # Dates are compared as strings, so free text like "last week" would silently match nothing
+    dates = {"trip_date_from": trip_date_from, "trip_date_to": trip_date_to,
+             "booked_from": booked_from, "booked_to": booked_to}
+    for name, value in dates.items():
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return (f"Error: {name}={value!r} is not a date in YYYY-MM-DD format. "
+                        f"Convert it to a calendar date (today is {datetime.now():%Y-%m-%d}) and search again.")
+
+    try:
+        page = max(1, page)
+        rows, total = reservation_store.query(
+            destination=destination or None,
+            trip_date_from=trip_date_from or None,
+            trip_date_to=trip_date_to or None,
+            booked_from=booked_from or None,
+            booked_to=booked_to or None,
+            limit=SEARCH_PAGE_SIZE,
+            offset=(page - 1) * SEARCH_PAGE_SIZE
+        )
+    except Exception as e:
+        return f"Error searching reservations: {str(e)}"
+
+    if total == 0:
+        return "No reservations match these filters."
+
+    pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    if not rows:
+        return f"Page {page} is past the last page; {total} reservations fit on {pages} pages."
+    lines = [f"Found {total} reservations (page {page} of {pages}, ordered by trip date):"]
+    for res in rows:
+        lines.append(
+            f"{res['reservation_id']} | trip {res['planned_trip_date']} | {res['trip_destination']} | "
+            f"booked {res['reservation_date']} | {res['description'][:80]}"
+        )
+    if page < pages:
+        lines.append(f"Use page={page + 1} for more.")
+    return "\n".join(lines)
+
+
 ##TODO: Add tools that you want to use in the agent
-tools = [save_reservation, read_reservation]
+tools = [save_reservation, read_reservation, search_reservations]
 
 # Create a tools dictionary for easy lookup
 tools_dict = {tool.name: tool for tool in tools}
@@ -91,6 +168,148 @@ tools_dict = {tool.name: tool for tool in tools}
 # Bind tools to the LLM
 llm_with_tools = llm.bind_tools(tools)
 
+# Tool execution: independent tool calls from one turn run concurrently.
+# Timeouts are per tool (seconds), counted from when the call starts running
+# (not while it waits for a free worker); a timed-out call returns an error
+# ToolMessage to the model instead of blocking the loop. A timed-out thread
+# cannot be stopped, so tools that write are never timed out: the model would
+# retry a booking that may still go through.
+DEFAULT_TOOL_TIMEOUT = 30.0
+TOOL_TIMEOUTS = {
+    "read_reservation": 10.0,
+    "search_reservations": 30.0,
+}
+WRITE_TOOLS = {"save_reservation"}
+tool_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-tool")
+
+
+def _tool_timeout(tool_name: str, tool_timeouts: Optional[Dict[str, float]]) -> Optional[float]:
+    if tool_name in WRITE_TOOLS:
+        return None
+    timeouts = TOOL_TIMEOUTS if tool_timeouts is None else tool_timeouts
+    return timeouts.get(tool_name, DEFAULT_TOOL_TIMEOUT)
+
+
+def _timeout_message(tool_name: str, timeout: float) -> str:
+    return f"Error: tool {tool_name} timed out after {timeout:g}s (it only reads data, so it is safe to call again)"
+
+
+def _submit_timed(function, *args):
+    """Submit to `tool_executor`; returns the future and an event set when the call starts running."""
+    started = threading.Event()
+    timing: Dict[str, float] = {}
+
+    def run():
+        timing["start"] = time.monotonic()
+        started.set()
+        return function(*args)
+
+    return tool_executor.submit(run), started, timing
+
+
+def _wait_timed(future, started: threading.Event, timing: Dict[str, float], timeout: Optional[float]):
+    """Wait for a `_submit_timed` call; the timeout starts once the call leaves the queue."""
+    if timeout is None:
+        return future.result()
+    started.wait()
+    return future.result(timeout=max(timing["start"] + timeout - time.monotonic(), 0))
+
+
+def _invoke_traced(
+    tool_call: dict,
+    tracer: Optional[AgentTracer],
+    trace_id: Optional[str],
+    parent_id: Optional[str]
+):
+    """Invoke a known tool, recording a "tool" span when a tracer is given."""
+    tool = tools_dict[tool_call["name"]]
+    if tracer is None:
+        return tool.invoke(tool_call["args"])
+    with tracer.span("tool", tool_call["name"], trace_id=trace_id, parent_id=parent_id,
+                     tool_call_id=tool_call["id"]):
+        return tool.invoke(tool_call["args"])
+
+
+def execute_tool_calls(
+    tool_calls: List[dict],
+    parallel: bool = True,
+    tool_timeouts: Optional[Dict[str, float]] = None,
+    verbose: bool = True,
+    tracer: Optional[AgentTracer] = None,
+    trace_id: Optional[str] = None,
+    parent_id: Optional[str] = None
+) -> List[ToolMessage]:
+    """
+    Execute the tool calls of one model turn.
+
+    Args:
+        tool_calls: `response.tool_calls` of an AIMessage
+        parallel: Run the calls concurrently on `tool_executor` (False runs them one by one)
+        tool_timeouts: Per-tool timeouts in seconds (defaults to TOOL_TIMEOUTS)
+        verbose: Whether to print the calls and their results
+        tracer: Optional tracer recording one "tool" span per call
+        trace_id: Trace ID of the query the calls belong to
+        parent_id: Span ID of the enclosing iteration
+
+    Returns:
+        ToolMessages in the same order as `tool_calls`
+    """
+    def submit(tool_call):
+        if verbose:
+            print(f"\n> Calling tool: {tool_call['name']}")
+            print(f"  Arguments: {tool_call['args']}")
+        if tool_call["name"] not in tools_dict:
+            return None
+        return _submit_timed(_invoke_traced, tool_call, tracer, trace_id, parent_id)
+
+    def collect(tool_call, submitted):
+        tool_name = tool_call["name"]
+        if submitted is None:
+            tool_result = f"Error: Unknown tool {tool_name}"
+        else:
+            timeout = _tool_timeout(tool_name, tool_timeouts)
+            try:
+                tool_result = _wait_timed(*submitted, timeout)
+            except FutureTimeoutError:
+                tool_result = _timeout_message(tool_name, timeout)
+
+        if verbose:
+            print(f"  Result ({tool_name}): {tool_result}")
+        return ToolMessage(content=str(tool_result), tool_call_id=tool_call["id"])
+
+    if not parallel:
+        return [collect(call, submit(call)) for call in tool_calls]
+
+    # Submit everything first, then wait in the original order
+    submitted = [(call, submit(call)) for call in tool_calls]
+    return [collect(call, handle) for call, handle in submitted]
+
+
+async def _arun_tool_call(
+    tool_call: dict,
+    tool_timeouts: Optional[Dict[str, float]] = None,
+    tracer: Optional[AgentTracer] = None,
+    trace_id: Optional[str] = None,
+    parent_id: Optional[str] = None
+) -> ToolMessage:
+    """Await one tool call's `ainvoke` under its timeout (write tools are never cut off)."""
+    tool_name = tool_call["name"]
+    if tool_name not in tools_dict:
+        return ToolMessage(content=f"Error: Unknown tool {tool_name}", tool_call_id=tool_call["id"])
+    timeout = _tool_timeout(tool_name, tool_timeouts)
+    invocation = tools_dict[tool_name].ainvoke(tool_call["args"])
+    try:
+        if tracer is None:
+            tool_result = await asyncio.wait_for(invocation, timeout)
+        else:
+            with tracer.span("tool", tool_name, trace_id=trace_id, parent_id=parent_id,
+                             tool_call_id=tool_call["id"]):
+                tool_result = await asyncio.wait_for(invocation, timeout)
+    except asyncio.TimeoutError:
+        tool_result = _timeout_message(tool_name, timeout)
+    return ToolMessage(content=str(tool_result), tool_call_id=tool_call["id"])
+
+
 # System prompt for the agent
 SYSTEM_PROMPT = """You are a helpful travel booking assistant.
 You can help users make new travel reservations or look up existing ones.
@@ -101,6 +320,8 @@ To make a new reservation, you need:
 3. Any additional details or description
 
 To look up an existing reservation, you need the reservation ID.
+To answer questions about many reservations (e.g. all Paris trips in December), use
+search_reservations with filters instead of looking reservations up one by one.
 
 If you are not sure which tool is best for the task use multiple and then select best output.
 When you are using a tool, remember to provide all relevant context for the tool to execute the task.
@@ -109,73 +330,285 @@ If you gave the user some recommendations in previous messages and he agrees wit
 When analyzing tool output, compare it with Human question, if it only partially answered it explain it to the user."""
 
 
-def run_agent_with_query(query: str, verbose: bool = True) -> dict:
+def new_agent_context(tool_token_budget: int = 1000) -> AgentContext:
+    """
+    Start a multi-turn conversation for `run_agent_with_query(..., context=...)`.
+
+    Args:
+        tool_token_budget: Tokens of older tool outputs kept verbatim
+
+    Returns:
+        AgentContext starting with SYSTEM_PROMPT
+    """
+    return AgentContext(SYSTEM_PROMPT, tool_token_budget=tool_token_budget)
+
+
+def run_agent_with_query(
+    query: str,
+    verbose: bool = True,
+    parallel_tools: bool = True,
+    tool_timeouts: Optional[Dict[str, float]] = None,
+    tracer: Optional[AgentTracer] = None,
+    context: Optional[AgentContext] = None,
+    rate_limiter: Optional[BaseRateLimiter] = None
+) -> dict:
     """
     Run the agent with a query using a simple tool-calling loop.
 
     Args:
         query: The user's input query
         verbose: Whether to print intermediate steps
+        parallel_tools: Run the tool calls of one turn concurrently
+        tool_timeouts: Per-tool timeouts in seconds (defaults to TOOL_TIMEOUTS)
+        tracer: Optional tracer collecting query / iteration / build / LLM / tool spans
+        context: Optional conversation context (see `new_agent_context`); the query
+            continues that conversation and old tool outputs are truncated to its budget
+        rate_limiter: Optional limiter shared by concurrent sessions; acquired before every LLM call
 
     Returns:
-        Dictionary with input and output
+        Dictionary with input, output and the trace ID of the run
     """
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": query}
-    ]
+    tracer = tracer or AgentTracer()
+    if context is None:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": query}
+        ]
+    else:
+        messages = context.messages
+        messages.append({"role": "user", "content": query})
 
     if verbose:
         print(f"\n{'='*60}")
         print(f"User Query: {query}")
         print('='*60)
 
-    # Agent loop - keep going until no more tool calls
-    max_iterations = 10
-    for i in range(max_iterations):
-        # Get response from LLM
-        response = llm_with_tools.invoke(messages)
-        messages.append(response)
-
-        # Check if there are tool calls
-        if not response.tool_calls:
-            # No tool calls, we have the final answer
-            if verbose:
-                print(f"\nFinal Answer: {response.content}")
-            return {"input": query, "output": response.content}
-
-        # Process each tool call
-        for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-
-            if verbose:
-                print(f"\n> Calling tool: {tool_name}")
-                print(f"  Arguments: {tool_args}")
-
-            # Execute the tool
-            if tool_name in tools_dict:
-                tool_result = tools_dict[tool_name].invoke(tool_args)
-            else:
-                tool_result = f"Error: Unknown tool {tool_name}"
+    with tracer.span("query") as query_span:
+        trace_id = query_span["trace_id"]
+        output = "Max iterations reached"
+
+        # Agent loop - keep going until no more tool calls
+        max_iterations = 10
+        for i in range(max_iterations):
+            with tracer.span("iteration", trace_id=trace_id, parent_id=query_span["span_id"],
+                             iteration=i) as iteration_span:
+                # Build the messages sent to the LLM (truncates old tool outputs in a context)
+                with tracer.span("build", "prepare", trace_id=trace_id,
+                                 parent_id=iteration_span["span_id"]) as build_span:
+                    prompt_messages = context.prepare() if context else messages
+                    prompt_size = message_list_size(prompt_messages)
+                    build_span.update(prompt_size)
+
+                # Get response from LLM
+                if rate_limiter:
+                    rate_limiter.acquire()
+                with tracer.span("llm", trace_id=trace_id, parent_id=iteration_span["span_id"],
+                                 **prompt_size) as llm_span:
+                    response = llm_with_tools.invoke(prompt_messages)
+                    if context:
+                        context.record_usage(response.usage_metadata)
+                    usage = response.usage_metadata or {}
+                    llm_span["prompt_tokens"] = usage.get("input_tokens", 0)
+                    llm_span["completion_tokens"] = usage.get("output_tokens", 0)
+                    llm_span["tool_calls"] = len(response.tool_calls)
+
+                # Check if there are tool calls
+                if not response.tool_calls:
+                    with tracer.span("build", "append", trace_id=trace_id, parent_id=iteration_span["span_id"]):
+                        messages.append(response)
+                    # No tool calls, we have the final answer
+                    if verbose:
+                        print(f"\nFinal Answer: {response.content}")
+                    output = response.content
+                    break
+
+                # Execute the tool calls (concurrently) and add their results in call order
+                tool_messages = execute_tool_calls(
+                    response.tool_calls,
+                    parallel=parallel_tools,
+                    tool_timeouts=tool_timeouts,
+                    verbose=verbose,
+                    tracer=tracer,
+                    trace_id=trace_id,
+                    parent_id=iteration_span["span_id"]
+                )
+                with tracer.span("build", "append", trace_id=trace_id, parent_id=iteration_span["span_id"]):
+                    messages.append(response)
+                    messages.extend(tool_messages)
+                if verbose:
+                    print(f"  {tool_cache.format_stats()}")
+
+        query_span["iterations"] = i + 1
+        query_span.update(message_list_size(messages))
+
+    return {"input": query, "output": output, "trace_id": trace_id}
+
+
+async def astream_agent_with_query(
+    query: str,
+    tool_timeouts: Optional[Dict[str, float]] = None,
+    max_iterations: int = 10,
+    tracer: Optional[AgentTracer] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async streaming variant of `run_agent_with_query`.
 
-            if verbose:
-                print(f"  Result: {tool_result}")
+    Tokens are forwarded as soon as `llm_with_tools.astream` produces them, so a
+    UI can render the first chunk instead of waiting for the whole loop.
 
-            # Add tool result to messages
-            messages.append(ToolMessage(
-                content=str(tool_result),
-                tool_call_id=tool_call["id"]
-            ))
+    Args:
+        query: The user's input query
+        tool_timeouts: Per-tool timeouts in seconds (defaults to TOOL_TIMEOUTS)
+        max_iterations: Maximum number of LLM calls
+        tracer: Optional tracer collecting query / iteration / build / LLM / tool spans
+
+    Yields:
+        Event dictionaries, distinguished by "type":
+        - {"type": "token", "content": str}: a chunk of assistant text
+        - {"type": "tool_start", "id": str, "name": str, "args": dict}
+        - {"type": "tool_end", "id": str, "name": str, "result": str}: in completion order
+        - {"type": "final", "input": str, "output": str}: always the last event
+    """
+    tracer = tracer or AgentTracer()
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": query}
+    ]
 
-    return {"input": query, "output": "Max iterations reached"}
+    # Span durations include the time the consumer spends between events
+    with tracer.span("query") as query_span:
+        trace_id = query_span["trace_id"]
+        output = "Max iterations reached"
+
+        for i in range(max_iterations):
+            with tracer.span("iteration", trace_id=trace_id, parent_id=query_span["span_id"],
+                             iteration=i) as iteration_span:
+                with tracer.span("build", "prepare", trace_id=trace_id,
+                                 parent_id=iteration_span["span_id"]) as build_span:
+                    prompt_size = message_list_size(messages)
+                    build_span.update(prompt_size)
+
+                with tracer.span("llm", trace_id=trace_id, parent_id=iteration_span["span_id"],
+                                 **prompt_size) as llm_span:
+                    gathered = None
+                    async for chunk in llm_with_tools.astream(messages):
+                        if chunk.content:
+                            yield {"type": "token", "content": chunk.content}
+                        gathered = chunk if gathered is None else gathered + chunk
+
+                    response = message_chunk_to_message(gathered)
+                    usage = response.usage_metadata or {}
+                    llm_span["prompt_tokens"] = usage.get("input_tokens", 0)
+                    llm_span["completion_tokens"] = usage.get("output_tokens", 0)
+                    llm_span["tool_calls"] = len(response.tool_calls)
+
+                if not response.tool_calls:
+                    with tracer.span("build", "append", trace_id=trace_id, parent_id=iteration_span["span_id"]):
+                        messages.append(response)
+                    output = response.content
+                    break
+
+                tool_names = {}
+                tasks = []
+                for tool_call in response.tool_calls:
+                    tool_names[tool_call["id"]] = tool_call["name"]
+                    yield {"type": "tool_start", "id": tool_call["id"], "name": tool_call["name"], "args": tool_call["args"]}
+                    tasks.append(asyncio.create_task(_arun_tool_call(
+                        tool_call, tool_timeouts, tracer=tracer, trace_id=trace_id, parent_id=iteration_span["span_id"]
+                    )))
+
+                for finished in asyncio.as_completed(tasks):
+                    tool_message = await finished
+                    yield {
+                        "type": "tool_end",
+                        "id": tool_message.tool_call_id,
+                        "name": tool_names[tool_message.tool_call_id],
+                        "result": tool_message.content
+                    }
+
+                # ToolMessages go back to the model in the original call order
+                with tracer.span("build", "append", trace_id=trace_id, parent_id=iteration_span["span_id"]):
+                    messages.append(response)
+                    messages.extend(task.result() for task in tasks)
+
+        query_span["iterations"] = i + 1
+        query_span.update(message_list_size(messages))
+
+    yield {"type": "final", "input": query, "output": output}
+
+
+async def print_agent_stream(query: str, tracer: Optional[AgentTracer] = None):
+    """Print the events of `astream_agent_with_query` as they arrive."""
+    print(f"\nUser Query: {query}\nAssistant: ", end="", flush=True)
+    async for event in astream_agent_with_query(query, tracer=tracer):
+        if event["type"] == "token":
+            print(event["content"], end="", flush=True)
+        elif event["type"] == "tool_start":
+            print(f"\n> Calling tool: {event['name']} {event['args']}", flush=True)
+        elif event["type"] == "tool_end":
+            print(f"  Result ({event['name']}): {event['result']}", flush=True)
+    print()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Travel booking agent")
+    parser.add_argument("--stream", action="store_true", help="Use the async streaming loop")
+    parser.add_argument("--trace", metavar="PATH", help="Append spans to a JSONL file and print a latency summary")
+    parser.add_argument("--session", action="store_true",
+                        help="Run a scripted multi-turn booking session and report prompt tokens per iteration")
+    parser.add_argument("--replay", metavar="JSONL", help="Replay queries from a JSONL log as concurrent sessions")
+    parser.add_argument("--field", help="Query field of the replay records (default: query/input/body/text)")
+    parser.add_argument("--limit", type=int, help="Maximum number of replayed queries")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent replay sessions")
+    parser.add_argument("--rps", type=float, default=5.0, help="Global LLM requests per second during replay")
+    parser.add_argument("--output", default="replay_sessions.jsonl", help="Per-session replay results")
+    args = parser.parse_args()
+
     ##TODO: put a breakpoint in csv saving to see how agent and code overlap, evaluate inputs/outputs
     query = "I want to book a trip on 2023-12-25 to Paris, France. 2 people for 3 nights. Its a business trip"
-    output = run_agent_with_query(query)
-
     query_2 = "What is the status of reservation 9c89a904?"
-    output_2 = run_agent_with_query(query_2)
-    print(output_2)
+
+    if args.replay:
+        queries = load_queries(args.replay, field=args.field, limit=args.limit)
+        stats = replay_queries(
+            run_agent_with_query,
+            queries,
+            concurrency=args.concurrency,
+            requests_per_second=args.rps,
+            output_path=args.output,
+            trace_path=args.trace or "replay_traces.jsonl"
+        )
+        print(format_replay_report(stats))
+    elif args.session:
+        context = new_agent_context(tool_token_budget=300)
+        for session_query in [
+            query,
+            "Also book a trip on 2024-01-05 to Rome, Italy, 1 person, leisure.",
+            "Show me both reservations you just made.",
+            query_2,
+            "Move the Paris trip description to 'team offsite' by booking a new reservation with the same date.",
+        ]:
+            run_agent_with_query(session_query, verbose=False, context=context)
+        print(context.report())
+    elif args.stream:
+        tracer = AgentTracer()
+
+        async def stream_queries():
+            # One event loop for both queries: the LLM's async HTTP client is bound to it
+            for streamed_query in (query, query_2):
+                await print_agent_stream(streamed_query, tracer=tracer)
+
+        asyncio.run(stream_queries())
+        if args.trace:
+            tracer.export_jsonl(args.trace)
+            print(format_summary(tracer.summary()))
+    else:
+        tracer = AgentTracer()
+        output = run_agent_with_query(query, tracer=tracer)
+
+        output_2 = run_agent_with_query(query_2, tracer=tracer)
+        print(output_2)
+
+        if args.trace:
+            tracer.export_jsonl(args.trace)
+            print(format_summary(tracer.summary()))
@@ -0,0 +1,187 @@
+"""
+Conversation-scoped context management for the W3 agent loop.
+
+This module provides helper functions for:
+- Keeping one message list per conversation whose prefix (system prompt and
+  earlier turns) is byte-stable between requests, so provider-side prompt
+  caching (OpenAI caches prompt prefixes of 1024+ tokens) can hit
+- Truncating old ToolMessage bodies once they exceed a token budget
+- Reporting prompt tokens per iteration before and after truncation
+
+Truncation is oldest-first and sticky: a compacted ToolMessage is replaced in
+the conversation and sent in the same compacted form from then on, so each
+compaction changes the prompt only once, after the point where it happens.
+
+Usage:
+    python W3_agent_context.py --budget 300
+"""
+
+import argparse
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import tiktoken
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+# Approximate per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_message_tokens(message: Any, model: str = "gpt-4o") -> int:
+    """Approximate prompt tokens of one message (dict or LangChain message)."""
+    if isinstance(message, dict):
+        content = message["content"]
+        tool_calls = None
+    else:
+        content = message.content
+        tool_calls = getattr(message, "tool_calls", None)
+
+    text = content if isinstance(content, str) else json.dumps(content)
+    if tool_calls:
+        text += json.dumps([{"name": call["name"], "args": call["args"]} for call in tool_calls])
+    return len(_get_encoding(model).encode(text)) + MESSAGE_OVERHEAD_TOKENS
+
+
+class AgentContext:
+    """Message list of one agent conversation, compacted to a tool-output token budget."""
+
+    def __init__(
+        self,
+        system_prompt: str,
+        tool_token_budget: int = 1000,
+        stub_tokens: int = 24,
+        model: str = "gpt-4o"
+    ):
+        """
+        Args:
+            system_prompt: Static system prompt; always the first message, never modified
+            tool_token_budget: Tokens of older ToolMessage bodies kept verbatim
+            stub_tokens: Leading tokens kept from a truncated ToolMessage
+            model: Model name used to pick the tokenizer
+        """
+        self.tool_token_budget = tool_token_budget
+        self.stub_tokens = stub_tokens
+        self.model = model
+        self.messages: List[Any] = [{"role": "system", "content": system_prompt}]
+        self.iterations: List[Dict[str, Any]] = []
+        self._full_tokens: List[int] = []
+        self._sent_tokens: List[int] = []
+        self._compacted: set = set()
+
+    def _truncate(self, message: ToolMessage) -> ToolMessage:
+        encoding = _get_encoding(self.model)
+        encoded = encoding.encode(message.content)
+        head = encoding.decode(encoded[:self.stub_tokens])
+        return ToolMessage(
+            content=f"{head}\n[... truncated {len(encoded) - self.stub_tokens} tokens of earlier tool output]",
+            tool_call_id=message.tool_call_id
+        )
+
+    def prepare(self) -> List[Any]:
+        """
+        Compact old tool outputs and return the messages to send.
+
+        ToolMessages after the last AIMessage are the results the model has not
+        seen yet and are always sent in full.
+
+        Returns:
+            The conversation's message list (compacted in place)
+        """
+        for message in self.messages[len(self._full_tokens):]:
+            tokens = count_message_tokens(message, self.model)
+            self._full_tokens.append(tokens)
+            self._sent_tokens.append(tokens)
+
+        last_ai = max((i for i, m in enumerate(self.messages) if isinstance(m, AIMessage)), default=-1)
+        old_tools = [
+            i for i in range(last_ai)
+            if isinstance(self.messages[i], ToolMessage) and i not in self._compacted
+        ]
+        verbatim = sum(self._sent_tokens[i] for i in old_tools)
+        for i in old_tools:
+            if verbatim <= self.tool_token_budget:
+                break
+            if self._sent_tokens[i] - MESSAGE_OVERHEAD_TOKENS <= self.stub_tokens:
+                continue
+            self.messages[i] = self._truncate(self.messages[i])
+            self._compacted.add(i)
+            verbatim -= self._sent_tokens[i]
+            self._sent_tokens[i] = count_message_tokens(self.messages[i], self.model)
+
+        self.iterations.append({
+            "iteration": len(self.iterations),
+            "messages": len(self.messages),
+            "prompt_tokens_full": sum(self._full_tokens),
+            "prompt_tokens_sent": sum(self._sent_tokens),
+            "truncated_tool_messages": len(self._compacted)
+        })
+        return self.messages
+
+    def record_usage(self, usage_metadata: Optional[Dict[str, Any]]):
+        """Attach the provider-reported prompt and cached tokens to the last iteration."""
+        if not usage_metadata or not self.iterations:
+            return
+        details = usage_metadata.get("input_token_details") or {}
+        self.iterations[-1]["provider_prompt_tokens"] = usage_metadata.get("input_tokens", 0)
+        self.iterations[-1]["provider_cached_tokens"] = details.get("cache_read", 0)
+
+    def report(self) -> str:
+        """Per-iteration prompt token table (full transcript vs what was sent)."""
+        lines = [f"{'iter':>4}{'messages':>10}{'full tok':>10}{'sent tok':>10}{'saved':>8}{'truncated':>11}{'cached':>8}"]
+        for row in self.iterations:
+            saved = 1 - row["prompt_tokens_sent"] / row["prompt_tokens_full"]
+            lines.append(
+                f"{row['iteration']:>4}{row['messages']:>10}{row['prompt_tokens_full']:>10}"
+                f"{row['prompt_tokens_sent']:>10}{saved:>8.0%}{row['truncated_tool_messages']:>11}"
+                f"{row.get('provider_cached_tokens', '-'):>8}"
+            )
+        return "\n".join(lines)
+
+
+def _scripted_session(context: AgentContext, turns: int = 6):
+    """Offline booking session: each turn books a trip and looks up two reservations."""
+    for turn in range(turns):
+        context.messages.append(HumanMessage(
+            content=f"Book a trip to destination #{turn} on 2025-12-{turn + 1:02d} and show me reservations {turn}a and {turn}b."
+        ))
+        context.prepare()
+        context.messages.append(AIMessage(content="", tool_calls=[
+            {"name": "save_reservation", "id": f"s{turn}",
+             "args": {"planned_trip_date": f"2025-12-{turn + 1:02d}", "trip_destination": f"destination #{turn}",
+                      "description": "2 people, 3 nights"}},
+            {"name": "read_reservation", "id": f"ra{turn}", "args": {"reservation_id": f"{turn}a"}},
+            {"name": "read_reservation", "id": f"rb{turn}", "args": {"reservation_id": f"{turn}b"}},
+        ]))
+        context.messages.append(ToolMessage(
+            content=f"Reservation created successfully! Your reservation ID is: {turn}c", tool_call_id=f"s{turn}"
+        ))
+        for suffix in "ab":
+            context.messages.append(ToolMessage(
+                content=(
+                    f"Reservation found:\nID: {turn}{suffix}\nBooked on: 2025-01-01\nTrip date: 2025-12-24\n"
+                    f"Destination: Paris, France\nDetails: " + "Business trip with hotel, transfers and dinner plans. " * 8
+                ),
+                tool_call_id=f"r{suffix}{turn}"
+            ))
+        context.prepare()
+        context.messages.append(AIMessage(content=f"Booked {turn}c; here are reservations {turn}a and {turn}b."))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prompt tokens per iteration with and without tool-output truncation")
+    parser.add_argument("--budget", type=int, default=1000, help="Tool-output token budget")
+    parser.add_argument("--turns", type=int, default=6)
+    args = parser.parse_args()
+
+    context = AgentContext("You are a helpful travel booking assistant.", tool_token_budget=args.budget)
+    _scripted_session(context, turns=args.turns)
+    print(context.report())
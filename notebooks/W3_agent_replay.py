@@ -0,0 +1,169 @@
+"""
+Batch replay of agent query logs.
+
+This module provides helper functions for:
+- Loading historical queries from a JSONL log
+- Running many independent agent sessions concurrently under one global
+  LLM request rate limit
+- Writing per-session outputs and traces to JSONL
+- Reporting throughput, latency percentiles and tool-call distributions
+
+The agent itself lives in W3-agent_with_tools.py (not importable because of
+the dash), which wires this module into its `--replay` option:
+    RESERVATIONS_PATH=replay_reservations.csv python W3-agent_with_tools.py --replay requests.jsonl --concurrency 16 --rps 5
+"""
+
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+from W3_agent_trace import AgentTracer
+
+QUERY_FIELDS = ("query", "input", "body", "text")
+
+
+def load_queries(path: str, field: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+    """
+    Read queries from a JSONL log.
+
+    Args:
+        path: JSONL file, one record per line
+        field: Record field holding the query (by default the first of QUERY_FIELDS present)
+        limit: Maximum number of queries to read
+
+    Returns:
+        List of query strings
+    """
+    queries = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            key = field or next((name for name in QUERY_FIELDS if name in record), None)
+            if key is None:
+                raise ValueError(f"No query field ({', '.join(QUERY_FIELDS)}) in record: {line[:200]}")
+            queries.append(record[key])
+            if limit is not None and len(queries) >= limit:
+                break
+    return queries
+
+
+def replay_queries(
+    run_session: Callable[..., dict],
+    queries: List[str],
+    concurrency: int = 8,
+    requests_per_second: float = 5.0,
+    output_path: str = "replay_sessions.jsonl",
+    trace_path: Optional[str] = "replay_traces.jsonl"
+) -> Dict[str, Any]:
+    """
+    Run one agent session per query, concurrently.
+
+    Args:
+        run_session: `run_agent_with_query`; called as
+            run_session(query, verbose=False, tracer=..., rate_limiter=...)
+        queries: Queries to replay
+        concurrency: Maximum number of sessions running at the same time
+        requests_per_second: Global LLM request rate shared by all sessions
+        output_path: JSONL file for per-session results (overwritten)
+        trace_path: JSONL file for spans of all sessions (overwritten), or None
+
+    Returns:
+        Aggregate statistics (see `format_replay_report`)
+    """
+    rate_limiter = InMemoryRateLimiter(
+        requests_per_second=requests_per_second,
+        check_every_n_seconds=0.05,
+        max_bucket_size=max(1, concurrency)
+    )
+    tracer = AgentTracer()
+
+    def run(index: int, query: str) -> Dict[str, Any]:
+        session_tracer = AgentTracer()
+        start = time.perf_counter()
+        record: Dict[str, Any] = {"session": index, "input": query}
+        try:
+            result = run_session(query, verbose=False, tracer=session_tracer, rate_limiter=rate_limiter)
+            record.update(output=result["output"], trace_id=result.get("trace_id"))
+        except Exception as e:
+            record["error"] = repr(e)
+        record["latency_s"] = time.perf_counter() - start
+
+        spans = session_tracer.spans
+        record["iterations"] = sum(1 for span in spans if span["kind"] == "iteration")
+        record["tool_calls"] = dict(Counter(span["name"] for span in spans if span["kind"] == "tool"))
+        record["prompt_tokens"] = sum(span.get("prompt_tokens", 0) for span in spans)
+        record["completion_tokens"] = sum(span.get("completion_tokens", 0) for span in spans)
+        tracer.extend(spans)
+        return record
+
+    records = []
+    start = time.perf_counter()
+    with open(output_path, 'w', encoding='utf-8') as output, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay") as executor:
+        futures = [executor.submit(run, index, query) for index, query in enumerate(queries)]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            output.flush()
+    elapsed = time.perf_counter() - start
+
+    if trace_path:
+        tracer.export_jsonl(trace_path, append=False)
+    return summarize_replay(records, elapsed)
+
+
+def summarize_replay(records: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """
+    Aggregate per-session records.
+
+    Args:
+        records: Records written by `replay_queries`
+        elapsed: Wall time of the whole replay in seconds
+
+    Returns:
+        Dictionary with throughput, latency percentiles, token totals and tool-call distributions
+    """
+    latencies = np.array([record["latency_s"] for record in records]) if records else np.zeros(1)
+    tool_totals: Counter = Counter()
+    calls_per_session: Counter = Counter()
+    for record in records:
+        tool_totals.update(record["tool_calls"])
+        calls_per_session[sum(record["tool_calls"].values())] += 1
+
+    return {
+        "sessions": len(records),
+        "errors": sum(1 for record in records if "error" in record),
+        "elapsed_s": elapsed,
+        "sessions_per_s": len(records) / elapsed if elapsed else 0.0,
+        "latency_p50_s": float(np.percentile(latencies, 50)),
+        "latency_p95_s": float(np.percentile(latencies, 95)),
+        "latency_p99_s": float(np.percentile(latencies, 99)),
+        "prompt_tokens": sum(record["prompt_tokens"] for record in records),
+        "completion_tokens": sum(record["completion_tokens"] for record in records),
+        "tool_calls": dict(tool_totals.most_common()),
+        "tool_calls_per_session": dict(sorted(calls_per_session.items()))
+    }
+
+
+def format_replay_report(stats: Dict[str, Any]) -> str:
+    """Render `summarize_replay` statistics as text."""
+    lines = [
+        f"Sessions: {stats['sessions']} ({stats['errors']} errors) in {stats['elapsed_s']:.1f}s "
+        f"-> {stats['sessions_per_s']:.2f} sessions/s",
+        f"Latency: p50 {stats['latency_p50_s']:.2f}s | p95 {stats['latency_p95_s']:.2f}s | "
+        f"p99 {stats['latency_p99_s']:.2f}s",
+        f"Tokens: {stats['prompt_tokens']} prompt / {stats['completion_tokens']} completion",
+        "Tool calls: " + (", ".join(f"{name}={count}" for name, count in stats["tool_calls"].items()) or "none"),
+        "Tool calls per session: " + ", ".join(
+            f"{calls}: {sessions}" for calls, sessions in stats["tool_calls_per_session"].items()
+        )
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,183 @@
+"""
+Structured tracing for the W3 agent loop.
+
+This module provides helper functions for:
+- Recording spans (query, iteration, message building, LLM call, tool call) with wall time,
+  prompt/completion tokens and message-list size
+- Exporting spans to JSONL, one span per line
+- Summarizing latency per stage (count, p50, p95, mean, total) over many queries
+
+Usage:
+    python W3_agent_trace.py summary agent_traces.jsonl
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+
+def new_id() -> str:
+    """Random 16-hex-character span / trace ID."""
+    return uuid.uuid4().hex[:16]
+
+
+def message_list_size(messages: List[Any]) -> Dict[str, int]:
+    """Number of messages and total characters of their content."""
+    chars = 0
+    for message in messages:
+        content = message["content"] if isinstance(message, dict) else message.content
+        chars += len(content) if isinstance(content, str) else len(json.dumps(content))
+    return {"messages": len(messages), "message_chars": chars}
+
+
+class AgentTracer:
+    """Thread-safe in-memory span collector (tool spans are recorded from worker threads)."""
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(
+        self,
+        kind: str,
+        name: Optional[str] = None,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        **attributes
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block of code as one span.
+
+        The yielded dictionary is the span record; callers add fields such as
+        `prompt_tokens` to it before the block ends.
+
+        Args:
+            kind: Stage of the span ("query", "iteration", "build", "llm" or "tool")
+            name: Span name (defaults to `kind`, tool spans use the tool name)
+            trace_id: ID shared by all spans of one query (new if None)
+            parent_id: `span_id` of the enclosing span
+            **attributes: Extra fields stored with the span
+
+        Yields:
+            The span record
+        """
+        record = {
+            "trace_id": trace_id or new_id(),
+            "span_id": new_id(),
+            "parent_id": parent_id,
+            "kind": kind,
+            "name": name or kind,
+            "start": time.time(),
+            **attributes
+        }
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = repr(e)
+            raise
+        finally:
+            record["wall_ms"] = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.spans.append(record)
+
+    def extend(self, spans: List[Dict[str, Any]]):
+        """Add spans recorded elsewhere (e.g. by a per-session tracer) to this tracer."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def export_jsonl(self, path: str, append: bool = True):
+        """
+        Write the collected spans to a JSONL file.
+
+        Args:
+            path: Output file
+            append: Append to an existing file instead of overwriting it
+        """
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, 'a' if append else 'w', encoding='utf-8') as file:
+            for record in spans:
+                file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-stage latency summary of the collected spans (see `summarize_spans`)."""
+        with self._lock:
+            return summarize_spans(list(self.spans))
+
+
+def load_jsonl(path: str) -> List[Dict[str, Any]]:
+    """Read spans written by `AgentTracer.export_jsonl`."""
+    with open(path, 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Aggregate spans per stage.
+
+    Stages are the span kinds plus one "tool:<name>" stage per tool.
+
+    Args:
+        spans: Span records
+
+    Returns:
+        One row per stage with count, p50/p95/mean/total wall time (ms) and token totals
+    """
+    stages: Dict[str, List[Dict[str, Any]]] = {}
+    for record in spans:
+        stages.setdefault(record["kind"], []).append(record)
+        if record["kind"] == "tool":
+            stages.setdefault(f"tool:{record['name']}", []).append(record)
+
+    rows = []
+    for stage, records in stages.items():
+        wall = np.array([record["wall_ms"] for record in records])
+        rows.append({
+            "stage": stage,
+            "count": len(records),
+            "p50_ms": float(np.percentile(wall, 50)),
+            "p95_ms": float(np.percentile(wall, 95)),
+            "mean_ms": float(wall.mean()),
+            "total_ms": float(wall.sum()),
+            "prompt_tokens": sum(record.get("prompt_tokens", 0) for record in records),
+            "completion_tokens": sum(record.get("completion_tokens", 0) for record in records),
+            "errors": sum(1 for record in records if "error" in record)
+        })
+    return rows
+
+
+def format_summary(rows: List[Dict[str, Any]]) -> str:
+    """Render `summarize_spans` rows as a fixed-width table."""
+    lines = [
+        f"{'stage':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}"
+        f"{'total ms':>11}{'prompt tok':>12}{'compl tok':>11}{'errors':>8}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['stage']:<28}{row['count']:>7}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+            f"{row['mean_ms']:>10.1f}{row['total_ms']:>11.1f}{row['prompt_tokens']:>12}"
+            f"{row['completion_tokens']:>11}{row['errors']:>8}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent trace tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    summary_parser = subparsers.add_parser("summary", help="Per-stage latency report of a JSONL trace")
+    summary_parser.add_argument("paths", nargs="+")
+
+    args = parser.parse_args()
+    spans = [record for path in args.paths for record in load_jsonl(path)]
+    traces = {record["trace_id"] for record in spans}
+    print(f"{len(spans)} spans from {len(traces)} queries")
+    print(format_summary(summarize_spans(spans)))
@@ -1,13 +1,19 @@
 import os
-import json
+import time
 import uuid
+import threading
+import argparse
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
 
+from W3_agent_context import count_message_tokens
+from W3_memory_policy import RollingSummaryMemory, SemanticMemory
+from W3_memory_store import CachedMemoryStore, get_memory_store
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -27,11 +33,42 @@ llm = ChatOpenAI(temperature=0.7, model_name="gpt-4o")
 # File path for our memory storage
 MEMORY_FILE = "conversation_memory.json"
 
-def initialize_memory_file():
-    """Initialize the JSON memory file if it doesn't exist"""
-    if not os.path.exists(MEMORY_FILE):
-        with open(MEMORY_FILE, 'w') as file:
-            json.dump({}, file)
+# Memory backend: the JSON file above by default; set MEMORY_BACKEND=sqlite or
+# MEMORY_BACKEND=jsonl for append-only stores (see W3_memory_store.py)
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "json")
+memory_store = get_memory_store(MEMORY_BACKEND, MEMORY_FILE if MEMORY_BACKEND == "json" else None)
+
+# Keep recent conversations in memory (writes still go to the store first);
+# MEMORY_CACHE_SIZE=0 reads every turn from disk
+MEMORY_CACHE_SIZE = int(os.getenv("MEMORY_CACHE_SIZE", "256"))
+if MEMORY_CACHE_SIZE > 0:
+    memory_store = CachedMemoryStore(memory_store, max_conversations=MEMORY_CACHE_SIZE)
+
+# Memory policy: "full" sends the whole history every turn; "summary" sends the
+# last turns verbatim plus a rolling summary of older ones; "semantic" sends the
+# last turns plus the earlier turns most similar to the input (see W3_memory_policy.py)
+MEMORY_POLICY = os.getenv("MEMORY_POLICY", "full")
+summary_memory = RollingSummaryMemory(
+    llm,
+    memory_store,
+    keep_last_turns=int(os.getenv("MEMORY_KEEP_TURNS", "4")),
+    summarize_after_tokens=int(os.getenv("MEMORY_SUMMARY_AFTER_TOKENS", "1000"))
+)
+_semantic_memory: Optional[SemanticMemory] = None
+_semantic_memory_lock = threading.Lock()
+
+def get_semantic_memory() -> SemanticMemory:
+    """Create the semantic memory (and its embedding client) the first time it is used"""
+    global _semantic_memory
+    with _semantic_memory_lock:
+        if _semantic_memory is None:
+            _semantic_memory = SemanticMemory(
+                OpenAIEmbeddings(model="text-embedding-3-small"),
+                directory=os.getenv("MEMORY_VECTORS_PATH", "conversation_vectors"),
+                top_k=int(os.getenv("MEMORY_TOP_K", "4")),
+                keep_last_turns=int(os.getenv("MEMORY_SEMANTIC_KEEP_TURNS", "2"))
+            )
+    return _semantic_memory
 
 def get_conversation_history(conversation_id: str) -> List[Dict[str, str]]:
     """
@@ -43,42 +80,36 @@ def get_conversation_history(conversation_id: str) -> List[Dict[str, str]]:
     Returns:
         List of message dictionaries
     """
-    initialize_memory_file()
-    
     try:
-        with open(MEMORY_FILE, 'r') as file:
-            all_conversations = json.load(file)
-            
         # Return the conversation history or empty list if not found
-        return all_conversations.get(conversation_id, [])
+        return memory_store.load(conversation_id)
     except Exception as e:
         print(f"Error retrieving conversation history: {str(e)}")
         return []
 
 def save_conversation(conversation_id: str, messages: List[Dict[str, str]]):
     """
-    Save conversation history to the JSON file
+    Save (overwrite) the whole conversation history
     
     Args:
         conversation_id: The unique ID for the conversation
         messages: List of message dictionaries
     """
-    initialize_memory_file()
-    
+    try:
+        memory_store.replace(conversation_id, messages)
+    except Exception as e:
+        print(f"Error saving conversation: {str(e)}")
 
-    ##TODO: open MEMORY_FILE, add new record with conversation as key and messages as value
+def append_to_conversation(conversation_id: str, new_messages: List[Dict[str, str]]):
+    """
+    Append new messages to a conversation; append-only backends write only these messages
+    
+    Args:
+        conversation_id: The unique ID for the conversation
+        new_messages: Messages added in this turn
+    """
     try:
-        # Read existing conversations
-        with open(MEMORY_FILE, 'r') as file:
-            all_conversations = json.load(file)
-        
-        # Update with new messages
-        all_conversations[conversation_id] = messages
-        
-        # Write back to file
-        with open(MEMORY_FILE, 'w') as file:
-            json.dump(all_conversations, file, indent=2)
-            
+        memory_store.append(conversation_id, new_messages)
     except Exception as e:
         print(f"Error saving conversation: {str(e)}")
 
@@ -111,7 +142,11 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-def chatbot_response(user_input: str, conversation_id: Optional[str] = None) -> Dict[str, Any]:
+def chatbot_response(
+    user_input: str,
+    conversation_id: Optional[str] = None,
+    memory_policy: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Generate a response from the chatbot with memory
     
@@ -119,10 +154,12 @@ def chatbot_response(user_input: str, conversation_id: Optional[str] = None) ->
         user_input: The user's query
         conversation_id: Optional ID to maintain conversation context
                          If None, a new conversation will be started
+        memory_policy: "full", "summary" or "semantic" (defaults to MEMORY_POLICY)
     
     Returns:
-        Dictionary with response and conversation_id
+        Dictionary with response, conversation_id, prompt_tokens and latency_s
     """
+    start = time.perf_counter()
     # Generate a new conversation ID if not provided
     if not conversation_id:
         conversation_id = str(uuid.uuid4())[:8]
@@ -131,11 +168,18 @@ def chatbot_response(user_input: str, conversation_id: Optional[str] = None) ->
     messages = get_conversation_history(conversation_id)
     
     # Add user message to history
-    messages.append({"role": "human", "content": user_input, "timestamp": datetime.now().isoformat()})
+    user_message = {"role": "human", "content": user_input, "timestamp": datetime.now().isoformat()}
+    messages.append(user_message)
     
     ##TODO: extract formatted history with format_messages_for_prompt function
     # Format messages for the prompt
-    formatted_history = format_messages_for_prompt(messages)
+    policy = memory_policy or MEMORY_POLICY
+    if policy == "summary":
+        formatted_history = summary_memory.build_history(conversation_id, messages)
+    elif policy == "semantic":
+        formatted_history = get_semantic_memory().build_history(conversation_id, messages)
+    else:
+        formatted_history = format_messages_for_prompt(messages)
     
     # Generate response
     ##TODO: Combine prompt and llm to create a chain, invoke it with chat_history and input arguments
@@ -145,34 +189,86 @@ def chatbot_response(user_input: str, conversation_id: Optional[str] = None) ->
     
     # Add AI response to history
     ##TODO: append AI response to messages list
-    messages.append({"role": "ai", "content": response.content, "timestamp": datetime.now().isoformat()})
+    ai_message = {"role": "ai", "content": response.content, "timestamp": datetime.now().isoformat()}
+    messages.append(ai_message)
     
-    # Save updated conversation
-    save_conversation(conversation_id, messages)
+    # Save the new turn
+    append_to_conversation(conversation_id, [user_message, ai_message])
     
+    usage = response.usage_metadata or {}
     return {
         "response": response.content,
-        "conversation_id": conversation_id
+        "conversation_id": conversation_id,
+        "prompt_tokens": usage.get("input_tokens") or sum(count_message_tokens(m) for m in formatted_history),
+        "latency_s": time.perf_counter() - start
     }
 
+def compare_memory_policies(turns: int = 30) -> str:
+    """
+    Run the same scripted conversation with every memory policy
+    
+    Args:
+        turns: Number of user messages (the first introduces the user, the last asks for their name)
+    
+    Returns:
+        Per-turn table of prompt tokens and latency for each policy
+    """
+    topics = ["flights", "hotels", "local food", "museums", "trains", "weather", "budget", "packing"]
+    script = ["Hi, my name is Alice. I'm planning a two-week trip to Spain next month."]
+    script += [
+        f"Can you give me detailed advice about {topics[i % len(topics)]} for day {i} of the trip?"
+        for i in range(1, turns - 1)
+    ]
+    script.append("By the way, do you remember my name?")
+
+    results = {}
+    policies = ("full", "summary", "semantic")
+    for policy in policies:
+        conversation_id = None
+        results[policy] = []
+        for message in script:
+            result = chatbot_response(message, conversation_id, memory_policy=policy)
+            conversation_id = result["conversation_id"]
+            results[policy].append(result)
+
+    lines = [f"{'turn':>4}" + "".join(f"{policy + ' tok':>14}{policy + ' s':>12}" for policy in policies)]
+    for turn in range(len(script)):
+        lines.append(f"{turn + 1:>4}" + "".join(
+            f"{results[policy][turn]['prompt_tokens']:>14}{results[policy][turn]['latency_s']:>12.2f}"
+            for policy in policies
+        ))
+    for policy, rows in results.items():
+        lines.append(
+            f"{policy}: {sum(r['prompt_tokens'] for r in rows)} prompt tokens, "
+            f"{sum(r['latency_s'] for r in rows):.1f}s total; last answer: {rows[-1]['response'][:120]!r}"
+        )
+    return "\n".join(lines)
+
 if __name__ == "__main__":
-    # Example of a new conversation
-    message1 = "Hi, my name is Alice. How are you today?"
-    result = chatbot_response(message1)
-    print(f"Conversation ID: {result['conversation_id']}")
-    print(f"Human: {message1}")
-    print(f"AI: {result['response']}\n")
-    
-    # Continue the same conversation
-    conv_id = result['conversation_id']
-    message2 = "I'm planning a trip to Spain next month. Have you been there?"
-    result2 = chatbot_response( message2, conv_id)
-    print(f"Human: {message2}")
-    print(f"AI: {result2['response']}\n")
-    
-    
-    # Ask something related to earlier information
-    message3="Can you remind me what my name is?"
-    result3 = chatbot_response(message3, conv_id)
-    print(f"Human: {message3}")
-    print(f"AI: {result3['response']}\n")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Chatbot with conversation memory")
+    parser.add_argument("--compare-policies", type=int, metavar="TURNS",
+                        help="Compare prompt tokens and latency of the full, summary and semantic memory policies")
+    args = parser.parse_args()
+    if args.compare_policies:
+        print(compare_memory_policies(args.compare_policies))
+    else:
+        # Example of a new conversation
+        message1 = "Hi, my name is Alice. How are you today?"
+        result = chatbot_response(message1)
+        print(f"Conversation ID: {result['conversation_id']}")
+        print(f"Human: {message1}")
+        print(f"AI: {result['response']}\n")
+    
+        # Continue the same conversation
+        conv_id = result['conversation_id']
+        message2 = "I'm planning a trip to Spain next month. Have you been there?"
+        result2 = chatbot_response( message2, conv_id)
+        print(f"Human: {message2}")
+        print(f"AI: {result2['response']}\n")
+    
+    
+        # Ask something related to earlier information
+        message3="Can you remind me what my name is?"
+        result3 = chatbot_response(message3, conv_id)
+        print(f"Human: {message3}")
+        print(f"AI: {result3['response']}\n")
@@ -0,0 +1,344 @@
+"""
+Bounded-prompt memory policies for the W3 chat assistant.
+
+This module provides helper functions for:
+- Keeping the last K turns of a conversation verbatim
+- Folding older turns into an incrementally updated summary once they exceed
+  a token threshold (tiktoken tokens)
+- Storing each summary in the conversation itself (a {"role": "summary"}
+  record appended to the memory store), so it is never regenerated
+- Retrieving only the top-k earlier turns relevant to the current input from
+  a local NumPy vector index (brute-force cosine similarity)
+
+`format_messages_for_prompt` only picks up "human" and "ai" messages, so
+summary records are invisible to code that replays the full history.
+
+The vector index keeps one append-only file per conversation
+(`<directory>/<conversation_id>.f32`: an int32 dimension count, then one
+float32 row per human/AI turn); each turn embeds only the turns appended since
+the last call. Appends take an exclusive file lock and skip rows another
+process wrote meanwhile, so row i is always turn i.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from W3_agent_context import count_message_tokens
+from W3_memory_store import MemoryStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+# Vector files start with the embedding dimension count
+_HEADER_BYTES = 4
+
+summary_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system",
+         """You maintain a running summary of a conversation between a user and an assistant.
+         Keep every fact the user shared about themselves (name, preferences, plans, dates)
+         and any decisions or recommendations made. Drop small talk.
+         Write at most {max_words} words."""),
+        ("human", "Current summary:\n{summary}\n\nNew messages:\n{messages}\n\nReturn the updated summary."),
+    ]
+)
+
+
+class RollingSummaryMemory:
+    """Builds a bounded chat history: summary of older turns plus the last K turns verbatim."""
+
+    def __init__(
+        self,
+        llm: BaseChatModel,
+        store: MemoryStore,
+        keep_last_turns: int = 4,
+        summarize_after_tokens: int = 1000,
+        summary_max_tokens: int = 300,
+        model: str = "gpt-4o"
+    ):
+        """
+        Args:
+            llm: Chat model used to write summaries
+            store: Memory store the summary records are appended to
+            keep_last_turns: Human/AI turn pairs always sent verbatim
+            summarize_after_tokens: Older, unsummarized messages are folded into the
+                summary once they exceed this many tokens
+            summary_max_tokens: Maximum length of a summary
+            model: Model name used to pick the tokenizer
+        """
+        self.store = store
+        self.keep_last_turns = keep_last_turns
+        self.summarize_after_tokens = summarize_after_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.model = model
+        self.summary_chain = summary_prompt | llm.bind(max_tokens=summary_max_tokens)
+        self.last_stats: Dict[str, Any] = {}
+
+    def _summarize(self, previous: str, messages: List[Dict[str, Any]]) -> str:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        response = self.summary_chain.invoke({
+            "summary": previous or "(none)",
+            "messages": transcript,
+            "max_words": int(self.summary_max_tokens * 0.75)
+        })
+        return response.content
+
+    def build_history(self, conversation_id: str, messages: List[Dict[str, Any]]) -> List[BaseMessage]:
+        """
+        Turn the stored conversation into a bounded chat history.
+
+        Args:
+            conversation_id: ID of the conversation (summary records are appended to it)
+            messages: Stored messages including the current user message
+
+        Returns:
+            LangChain messages: the summary (if any) as a SystemMessage, then the
+            unsummarized turns
+        """
+        dialog = [m for m in messages if m["role"] in ("human", "ai")]
+        summaries = [m for m in messages if m["role"] == "summary"]
+        summary: Optional[Dict[str, Any]] = summaries[-1] if summaries else None
+        covered = summary["covers"] if summary else 0
+
+        # The current user message plus the last K turns stay verbatim
+        window_start = max(covered, len(dialog) - 2 * self.keep_last_turns - 1)
+        pending = dialog[covered:window_start]
+        pending_tokens = sum(count_message_tokens(m, self.model) for m in pending)
+
+        summary_latency = 0.0
+        if pending and pending_tokens > self.summarize_after_tokens:
+            start = time.perf_counter()
+            content = self._summarize(summary["content"] if summary else "", pending)
+            summary_latency = time.perf_counter() - start
+            summary = {
+                "role": "summary",
+                "content": content,
+                "covers": window_start,
+                "timestamp": datetime.now().isoformat()
+            }
+            self.store.append(conversation_id, [summary])
+            covered = window_start
+
+        history: List[BaseMessage] = []
+        if summary:
+            history.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary['content']}"))
+        for m in dialog[covered:]:
+            history.append(HumanMessage(content=m["content"]) if m["role"] == "human" else AIMessage(content=m["content"]))
+
+        self.last_stats = {
+            "summarized": summary_latency > 0,
+            "summary_latency_s": summary_latency,
+            "verbatim_messages": len(dialog) - covered,
+            "history_tokens": sum(count_message_tokens(m, self.model) for m in history)
+        }
+        return history
+
+
+def _turn_text(human: Dict[str, Any], ai: Dict[str, Any]) -> str:
+    return f"User: {human['content']}\nAssistant: {ai['content']}"
+
+
+class _VectorIndex:
+    """Unit-normalized turn embeddings of one conversation, grown with amortized doubling."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dimensions: Optional[int] = None
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.count = 0
+        self.refresh()
+
+    def _row_bytes(self) -> int:
+        return 4 * self.dimensions
+
+    def _append_in_memory(self, vectors: np.ndarray):
+        if self.count + len(vectors) > len(self.vectors):
+            capacity = max(16, 2 * len(self.vectors), self.count + len(vectors))
+            grown = np.zeros((capacity, self.dimensions), dtype=np.float32)
+            grown[:self.count] = self.vectors[:self.count]
+            self.vectors = grown
+        self.vectors[self.count:self.count + len(vectors)] = vectors
+        self.count += len(vectors)
+
+    def refresh(self):
+        """Load rows appended to the file (by this or another process) since the last call."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size < _HEADER_BYTES:
+            return
+        if self.dimensions is None:
+            self.dimensions = int(np.fromfile(self.path, dtype=np.int32, count=1)[0])
+            self.vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        rows = (size - _HEADER_BYTES) // self._row_bytes()  # ignore a torn last row
+        if rows > self.count:
+            data = np.fromfile(
+                self.path, dtype=np.float32, count=(rows - self.count) * self.dimensions,
+                offset=_HEADER_BYTES + self.count * self._row_bytes()
+            )
+            self._append_in_memory(data.reshape(-1, self.dimensions))
+
+    def extend(self, vectors: np.ndarray, first_row: int) -> int:
+        """
+        Append the rows of turns `first_row`, `first_row + 1`, ...
+
+        Rows that another process appended after `first_row` was read are skipped.
+
+        Returns:
+            Number of rows written
+        """
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        vectors = vectors.astype(np.float32)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'ab') as file:
+            if fcntl:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            self.refresh()
+            if self.dimensions is None:
+                # New (or torn-header) file: the first real embedding sets the dimensions
+                file.truncate(0)
+                file.write(np.int32(vectors.shape[1]).tobytes())
+                self.dimensions = vectors.shape[1]
+                self.vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+            else:
+                # Drop a torn last row so appended rows stay aligned
+                file.truncate(_HEADER_BYTES + self.count * self._row_bytes())
+            new_rows = vectors[self.count - first_row:]
+            file.write(new_rows.tobytes())
+            file.flush()
+        self._append_in_memory(new_rows)
+        return len(new_rows)
+
+    def search(self, query: np.ndarray, top_k: int, limit: int) -> List[Tuple[int, float]]:
+        """Best `top_k` rows among the first `limit`, as (row, cosine similarity)."""
+        limit = min(limit, self.count)
+        if limit <= 0 or top_k <= 0:
+            return []
+        scores = self.vectors[:limit] @ (query / max(np.linalg.norm(query), 1e-12)).astype(np.float32)
+        if top_k < limit:
+            best = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            best = np.arange(limit)
+        return [(int(row), float(scores[row])) for row in best]
+
+
+class SemanticMemory:
+    """Builds a bounded chat history: top-k relevant earlier turns plus the last K turns verbatim."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        directory: str = "conversation_vectors",
+        top_k: int = 4,
+        keep_last_turns: int = 2,
+        model: str = "gpt-4o"
+    ):
+        """
+        Args:
+            embeddings: Embedding model for turns and queries
+            directory: Directory holding one vector file per conversation
+            top_k: Earlier turns retrieved for the current input
+            keep_last_turns: Human/AI turn pairs always sent verbatim
+            model: Model name used to pick the tokenizer
+        """
+        self.embeddings = embeddings
+        self.directory = directory
+        self.top_k = top_k
+        self.keep_last_turns = keep_last_turns
+        self.model = model
+        self._indexes: Dict[str, _VectorIndex] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self.last_stats: Dict[str, Any] = {}
+
+    def _conversation(self, conversation_id: str) -> Tuple[_VectorIndex, threading.Lock]:
+        """Index and lock of one conversation; sessions of other conversations never wait on it."""
+        with self._registry_lock:
+            if conversation_id not in self._indexes:
+                path = os.path.join(self.directory, f"{conversation_id}.f32")
+                self._indexes[conversation_id] = _VectorIndex(path)
+                self._locks[conversation_id] = threading.Lock()
+            return self._indexes[conversation_id], self._locks[conversation_id]
+
+    def update(self, conversation_id: str, turns: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> int:
+        """
+        Embed the turns not indexed yet.
+
+        Args:
+            conversation_id: ID of the conversation
+            turns: All complete (human, ai) turns of the conversation, in order
+
+        Returns:
+            Number of turns embedded by this call
+        """
+        index, lock = self._conversation(conversation_id)
+        with lock:
+            index.refresh()
+            first_row = index.count
+            new_turns = turns[first_row:]
+            if not new_turns:
+                return 0
+            vectors = np.array(
+                self.embeddings.embed_documents([_turn_text(h, a) for h, a in new_turns]), dtype=np.float32
+            )
+            return index.extend(vectors, first_row)
+
+    def build_history(self, conversation_id: str, messages: List[Dict[str, Any]]) -> List[BaseMessage]:
+        """
+        Turn the stored conversation into a bounded chat history.
+
+        Args:
+            conversation_id: ID of the conversation
+            messages: Stored messages including the current user message
+
+        Returns:
+            LangChain messages: the retrieved earlier turns (if any) as a SystemMessage,
+            then the last turns and the current user message
+        """
+        dialog = [m for m in messages if m["role"] in ("human", "ai")]
+        current = dialog[-1] if dialog and dialog[-1]["role"] == "human" else None
+        past = dialog[:-1] if current else dialog
+        turns = [
+            (past[i], past[i + 1]) for i in range(len(past) - 1)
+            if past[i]["role"] == "human" and past[i + 1]["role"] == "ai"
+        ]
+
+        start = time.perf_counter()
+        embedded = self.update(conversation_id, turns)
+        recent_start = max(0, len(turns) - self.keep_last_turns)
+        hits: List[Tuple[int, float]] = []
+        if current and recent_start > 0:
+            query = np.array(self.embeddings.embed_query(current["content"]), dtype=np.float32)
+            index, lock = self._conversation(conversation_id)
+            with lock:
+                hits = index.search(query, self.top_k, recent_start)
+        retrieval_latency = time.perf_counter() - start
+
+        history: List[BaseMessage] = []
+        if hits:
+            retrieved = "\n\n".join(_turn_text(*turns[row]) for row, _ in sorted(hits))
+            history.append(SystemMessage(content=f"Relevant earlier messages from this conversation:\n{retrieved}"))
+        for human, ai in turns[recent_start:]:
+            history += [HumanMessage(content=human["content"]), AIMessage(content=ai["content"])]
+        if current:
+            history.append(HumanMessage(content=current["content"]))
+
+        self.last_stats = {
+            "embedded_turns": embedded,
+            "retrieved_turns": [row for row, _ in sorted(hits)],
+            "retrieval_latency_s": retrieval_latency,
+            "history_tokens": sum(count_message_tokens(m, self.model) for m in history)
+        }
+        return history
@@ -0,0 +1,741 @@
+"""
+Conversation memory backends for the W3 chat assistant.
+
+This module provides:
+- MemoryStore: the interface used by W3_chat_with_memory.py
+- JsonMemoryStore: the original single conversation_memory.json file
+  (every turn re-reads and rewrites all conversations), written atomically
+  under an inter-process lock, compact orjson serialization by default
+- SqliteMemoryStore: one row per message, keyed by (conversation_id, seq)
+- JsonlMemoryStore: one append-only JSONL file per conversation
+- CachedMemoryStore: a process-level LRU cache of recent conversations in
+  front of any backend (write-through, version-checked on every load)
+- A one-shot migrator from conversation_memory.json, a benchmark and a
+  multiprocess write stress test
+
+Appending a turn to the SQLite and JSONL stores writes only that turn.
+
+Each backend exposes a cheap per-conversation version (counters in a small
+`<file>.versions` sidecar for JSON, file inode/size/mtime for JSONL, a counter
+row for SQLite), so a cached conversation is served from memory until another
+thread or process changes that conversation.
+
+Usage:
+    python W3_memory_store.py migrate --json conversation_memory.json --backend sqlite --path conversation_memory.db
+    python W3_memory_store.py benchmark --conversations 100000
+    python W3_memory_store.py stress --backend json --processes 4 --threads 4 --turns 25
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+Message = Dict[str, str]
+Version = Optional[Hashable]
+
+
+def _file_version(path: str) -> Tuple[int, ...]:
+    """(inode, size, mtime) of a file; () when it is missing or empty."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return ()
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns) if stat.st_size else ()
+
+
+class MemoryStore:
+    """Interface for conversation memory backends."""
+
+    def load(self, conversation_id: str) -> List[Message]:
+        """Return the messages of a conversation in order (empty list if unknown)."""
+        raise NotImplementedError
+
+    def append(self, conversation_id: str, messages: List[Message]):
+        """Add messages to the end of a conversation."""
+        raise NotImplementedError
+
+    def append_many(self, conversations: Iterable[Tuple[str, List[Message]]]):
+        """Append to many conversations; backends may override this with a bulk write."""
+        for conversation_id, messages in conversations:
+            self.append(conversation_id, messages)
+
+    def replace(self, conversation_id: str, messages: List[Message]):
+        """Overwrite a conversation with `messages`."""
+        raise NotImplementedError
+
+    def conversation_ids(self) -> List[str]:
+        """Return the IDs of all stored conversations."""
+        raise NotImplementedError
+
+    def version(self, conversation_id: str) -> Version:
+        """Return a cheap token that changes whenever the conversation changes (None if unsupported)."""
+        return None
+
+    def append_versioned(self, conversation_id: str, messages: List[Message]) -> Tuple[Version, Version]:
+        """Append and return the conversation's version right before and right after the write."""
+        self.append(conversation_id, messages)
+        return None, None
+
+
+class JsonMemoryStore(MemoryStore):
+    """All conversations in one JSON object {conversation_id: [messages]}."""
+
+    def __init__(self, path: str = "conversation_memory.json", compact: bool = True):
+        """
+        Args:
+            path: JSON file location
+            compact: Write without indentation (with orjson when installed);
+                False keeps the original indent=2 layout
+        """
+        self.path = path
+        self.versions_path = f"{path}.versions"
+        self.compact = compact
+        self._lock = threading.Lock()
+        self._versions_cache: Tuple[Tuple[int, ...], Dict[str, Any]] = ((), {})
+
+    def initialize(self):
+        """Create the JSON file if it doesn't exist."""
+        if not os.path.exists(self.path):
+            with self._locked():
+                if not os.path.exists(self.path):
+                    self._write_all({})
+
+    @contextmanager
+    def _locked(self):
+        """Serialize writers across threads and processes (lock file next to the JSON file)."""
+        with self._lock, open(f"{self.path}.lock", 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _read_all(self) -> Dict[str, List[Message]]:
+        # Writers replace the file atomically, so readers always see a complete version
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        return orjson.loads(data) if orjson else json.loads(data)
+
+    def _write_all(self, conversations: Dict[str, List[Message]]):
+        """Write to a temporary file, fsync it and rename it over the old file."""
+        if not self.compact:
+            data = json.dumps(conversations, indent=2).encode("utf-8")
+        elif orjson:
+            data = orjson.dumps(conversations)
+        else:
+            data = json.dumps(conversations, separators=(",", ":")).encode("utf-8")
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".conversation_memory.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if hasattr(os, "O_DIRECTORY"):
+            # Persist the rename itself
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _read_versions(self) -> Dict[str, Any]:
+        """Contents of the versions sidecar, re-parsed only when the sidecar changes."""
+        stat = _file_version(self.versions_path)
+        cached_stat, versions = self._versions_cache
+        if stat != cached_stat:
+            try:
+                with open(self.versions_path, 'rb') as file:
+                    versions = json.loads(file.read())
+            except (FileNotFoundError, ValueError):
+                versions = {}
+            self._versions_cache = (stat, versions)
+        return versions
+
+    def _commit(self, conversations: Dict[str, List[Message]], changed: Iterable[str]):
+        """
+        Write all conversations, then bump the counters of `changed` in the versions sidecar.
+
+        The sidecar records the stat of the JSON file it describes. If the JSON file was
+        changed without it (older code, a crash between the two writes), every counter
+        restarts under a new epoch so no cached conversation is trusted.
+        """
+        versions = self._read_versions()
+        if versions.get("file") != list(_file_version(self.path)):
+            versions = {"epoch": os.urandom(8).hex(), "conversations": {}}
+        counters = dict(versions["conversations"])
+        for conversation_id in changed:
+            counters[conversation_id] = counters.get(conversation_id, 0) + 1
+
+        self._write_all(conversations)
+        versions = {"epoch": versions["epoch"], "file": list(_file_version(self.path)), "conversations": counters}
+        tmp_path = f"{self.versions_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(versions, file, separators=(",", ":"))
+        os.replace(tmp_path, self.versions_path)
+        self._versions_cache = (_file_version(self.versions_path), versions)
+
+    def load(self, conversation_id: str) -> List[Message]:
+        self.initialize()
+        return self._read_all().get(conversation_id, [])
+
+    def append(self, conversation_id: str, messages: List[Message]):
+        self.append_versioned(conversation_id, messages)
+
+    def append_versioned(self, conversation_id: str, messages: List[Message]) -> Tuple[Version, Version]:
+        self.initialize()
+        with self._locked():
+            before = self.version(conversation_id)
+            all_conversations = self._read_all()
+            all_conversations.setdefault(conversation_id, []).extend(messages)
+            self._commit(all_conversations, [conversation_id])
+            return before, self.version(conversation_id)
+
+    def append_many(self, conversations: Iterable[Tuple[str, List[Message]]]):
+        self.initialize()
+        with self._locked():
+            all_conversations = self._read_all()
+            changed = []
+            for conversation_id, messages in conversations:
+                all_conversations.setdefault(conversation_id, []).extend(messages)
+                changed.append(conversation_id)
+            self._commit(all_conversations, changed)
+
+    def replace(self, conversation_id: str, messages: List[Message]):
+        self.initialize()
+        with self._locked():
+            all_conversations = self._read_all()
+            all_conversations[conversation_id] = messages
+            self._commit(all_conversations, [conversation_id])
+
+    def conversation_ids(self) -> List[str]:
+        self.initialize()
+        return list(self._read_all())
+
+    def version(self, conversation_id: str) -> Version:
+        # Writes to other conversations leave this counter alone; a sidecar that doesn't
+        # describe the current JSON file (mid-write or after a crash) means "unknown"
+        versions = self._read_versions()
+        if not versions or versions.get("file") != list(_file_version(self.path)):
+            return None
+        return versions["epoch"], versions["conversations"].get(conversation_id, 0)
+
+
+class SqliteMemoryStore(MemoryStore):
+    """One row per message; the (conversation_id, seq) primary key keeps loads and appends indexed."""
+
+    def __init__(self, path: str = "conversation_memory.db"):
+        """
+        Args:
+            path: SQLite database location
+        """
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS messages (
+                conversation_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                PRIMARY KEY (conversation_id, seq)
+            ) WITHOUT ROWID"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS conversation_versions (
+                conversation_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are not shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, conversation_id: str) -> List[Message]:
+        rows = self._connect().execute(
+            "SELECT message FROM messages WHERE conversation_id = ? ORDER BY seq", (conversation_id,)
+        ).fetchall()
+        return [json.loads(message) for (message,) in rows]
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection, conversation_id: str):
+        conn.execute(
+            """INSERT INTO conversation_versions (conversation_id, version) VALUES (?, 1)
+               ON CONFLICT (conversation_id) DO UPDATE SET version = version + 1""",
+            (conversation_id,)
+        )
+
+    def append(self, conversation_id: str, messages: List[Message]):
+        self.append_many([(conversation_id, messages)])
+
+    def append_versioned(self, conversation_id: str, messages: List[Message]) -> Tuple[Version, Version]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.version(conversation_id)
+            self._append(conn, conversation_id, messages)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return before, before + 1
+
+    def _append(self, conn: sqlite3.Connection, conversation_id: str, messages: List[Message]):
+        (next_seq,) = conn.execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        conn.executemany(
+            "INSERT INTO messages (conversation_id, seq, message) VALUES (?, ?, ?)",
+            [(conversation_id, next_seq + i, json.dumps(message)) for i, message in enumerate(messages)]
+        )
+        self._bump_version(conn, conversation_id)
+
+    def append_many(self, conversations: Iterable[Tuple[str, List[Message]]]):
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front, so concurrent appenders can't pick the same seq
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for conversation_id, messages in conversations:
+                self._append(conn, conversation_id, messages)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def replace(self, conversation_id: str, messages: List[Message]):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            conn.executemany(
+                "INSERT INTO messages (conversation_id, seq, message) VALUES (?, ?, ?)",
+                [(conversation_id, i, json.dumps(message)) for i, message in enumerate(messages)]
+            )
+            self._bump_version(conn, conversation_id)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def conversation_ids(self) -> List[str]:
+        rows = self._connect().execute("SELECT DISTINCT conversation_id FROM messages").fetchall()
+        return [conversation_id for (conversation_id,) in rows]
+
+    def version(self, conversation_id: str) -> Version:
+        row = self._connect().execute(
+            "SELECT version FROM conversation_versions WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+
+class JsonlMemoryStore(MemoryStore):
+    """One JSONL file per conversation, sharded into subdirectories by ID prefix."""
+
+    def __init__(self, directory: str = "conversation_memory"):
+        """
+        Args:
+            directory: Root directory of the conversation files
+        """
+        self.path = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _file(self, conversation_id: str) -> str:
+        # IDs become file names; anything outside a safe alphabet is hashed
+        name = conversation_id if re.fullmatch(r"[\w-]{1,64}", conversation_id) else \
+            hashlib.sha256(conversation_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, name[:2], f"{name}.jsonl")
+
+    def load(self, conversation_id: str) -> List[Message]:
+        try:
+            with open(self._file(conversation_id), 'r', encoding='utf-8') as file:
+                if fcntl:
+                    fcntl.flock(file, fcntl.LOCK_SH)
+                lines = file.read().split("\n")
+        except FileNotFoundError:
+            return []
+        # A crash mid-append can leave a partial last line; ignore it
+        messages = []
+        for line in lines:
+            if line.strip():
+                try:
+                    messages.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return messages
+
+    def append(self, conversation_id: str, messages: List[Message]):
+        self.append_versioned(conversation_id, messages)
+
+    def append_versioned(self, conversation_id: str, messages: List[Message]) -> Tuple[Version, Version]:
+        path = self._file(conversation_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = "".join(json.dumps(message, ensure_ascii=False) + "\n" for message in messages)
+        with open(path, 'a', encoding='utf-8') as file:
+            if fcntl:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            before = _file_version(path)
+            file.write(payload)
+            file.flush()
+            # Without flock another process may append in between; the cache then reloads
+            return (before if fcntl else None), _file_version(path)
+
+    def replace(self, conversation_id: str, messages: List[Message]):
+        path = self._file(conversation_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write("".join(json.dumps(message, ensure_ascii=False) + "\n" for message in messages))
+        os.replace(tmp_path, path)
+
+    def conversation_ids(self) -> List[str]:
+        ids = []
+        for shard in os.listdir(self.path):
+            shard_path = os.path.join(self.path, shard)
+            if os.path.isdir(shard_path):
+                ids.extend(name[:-len(".jsonl")] for name in os.listdir(shard_path) if name.endswith(".jsonl"))
+        return ids
+
+    def version(self, conversation_id: str) -> Version:
+        return _file_version(self._file(conversation_id))
+
+
+class CachedMemoryStore(MemoryStore):
+    """LRU cache of recent conversations in front of another store, with write-through appends."""
+
+    def __init__(self, store: MemoryStore, max_conversations: int = 256):
+        """
+        Args:
+            store: Backing store; every write goes to it first
+            max_conversations: Conversations kept in memory (least recently used are evicted)
+        """
+        self.store = store
+        self.path = getattr(store, "path", None)
+        self.max_conversations = max_conversations
+        self._entries: "OrderedDict[str, Tuple[Version, List[Message]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _put(self, conversation_id: str, version: Version, messages: List[Message]):
+        with self._lock:
+            self._entries[conversation_id] = (version, messages)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_conversations:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def load(self, conversation_id: str) -> List[Message]:
+        version = self.store.version(conversation_id)
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and version is not None and entry[0] == version:
+                self._entries.move_to_end(conversation_id)
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+        # A write between version() and load() leaves a newer list under an older
+        # version; the next load sees the mismatch and reloads
+        messages = self.store.load(conversation_id)
+        if version is not None:
+            self._put(conversation_id, version, messages)
+        return list(messages)
+
+    def append(self, conversation_id: str, messages: List[Message]):
+        self.append_versioned(conversation_id, messages)
+
+    def append_versioned(self, conversation_id: str, messages: List[Message]) -> Tuple[Version, Version]:
+        before, after = self.store.append_versioned(conversation_id, messages)
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            # Write through only if nobody else changed the conversation since it was cached
+            valid = entry is not None and before is not None and after is not None and entry[0] == before
+            if not valid:
+                self._entries.pop(conversation_id, None)
+        if valid:
+            self._put(conversation_id, after, entry[1] + list(messages))
+        return before, after
+
+    def replace(self, conversation_id: str, messages: List[Message]):
+        self.store.replace(conversation_id, messages)
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+    def conversation_ids(self) -> List[str]:
+        return self.store.conversation_ids()
+
+    def version(self, conversation_id: str) -> Version:
+        return self.store.version(conversation_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+
+def get_memory_store(backend: Optional[str] = None, path: Optional[str] = None) -> MemoryStore:
+    """
+    Create the memory store selected by arguments or environment variables.
+
+    Args:
+        backend: "json", "sqlite" or "jsonl" (defaults to MEMORY_BACKEND, then "json")
+        path: File or directory (defaults to MEMORY_PATH, then conversation_memory.json /
+            conversation_memory.db / conversation_memory/)
+
+    Returns:
+        MemoryStore instance
+    """
+    backend = backend or os.getenv("MEMORY_BACKEND", "json")
+    path = path or os.getenv("MEMORY_PATH")
+    if backend == "json":
+        return JsonMemoryStore(path or "conversation_memory.json")
+    if backend == "sqlite":
+        return SqliteMemoryStore(path or "conversation_memory.db")
+    if backend == "jsonl":
+        return JsonlMemoryStore(path or "conversation_memory")
+    raise ValueError(f"Unknown memory backend: {backend}")
+
+
+def migrate_json_memory(json_path: str, target: MemoryStore, batch_size: int = 1000) -> int:
+    """
+    Copy every conversation from a conversation_memory.json file into another store.
+
+    Args:
+        json_path: Existing JSON memory file
+        target: Empty store to copy into (messages are appended)
+        batch_size: Conversations written per bulk append
+
+    Returns:
+        Number of migrated conversations
+    """
+    with open(json_path, 'r') as file:
+        conversations = json.load(file)
+
+    items = list(conversations.items())
+    for start in range(0, len(items), batch_size):
+        target.append_many(items[start:start + batch_size])
+    return len(items)
+
+
+def _fake_turn(conversation: int, turn: int) -> List[Message]:
+    return [
+        {"role": "human", "content": f"Question {turn} in conversation {conversation} about a trip to Spain.",
+         "timestamp": "2025-01-01T12:00:00"},
+        {"role": "ai", "content": "Spain is a great destination! " * 4, "timestamp": "2025-01-01T12:00:01"},
+    ]
+
+
+def benchmark(conversations: int = 100_000, turns: int = 3, operations: int = 200, json_operations: int = 5):
+    """
+    Measure per-turn append and load latency of all backends.
+
+    Args:
+        conversations: Number of stored conversations
+        turns: Turns (human + AI message) per stored conversation
+        operations: Timed append + load pairs for SQLite and JSONL
+        json_operations: Timed pairs for the JSON file (each rewrites everything)
+
+    "cached load" is a load through CachedMemoryStore right after a write-through
+    append, i.e. the history lookup of a warm conversation.
+    """
+    ids = [f"{i:08x}" for i in range(conversations)]
+    print(f"{conversations} conversations x {turns} turns")
+    print(f"{'backend':>8} | {'populate (s)':>12} | {'append turn (ms)':>16} | {'load (ms)':>9} | "
+          f"{'cached load (ms)':>16} | {'size (MB)':>9}")
+    print("-" * 87)
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend, count in (("sqlite", operations), ("jsonl", operations), ("json", json_operations)):
+            base = os.path.join(tmp, backend)
+            os.makedirs(base)
+            name = {"json": "memory.json", "sqlite": "memory.db", "jsonl": "memory"}[backend]
+            store = get_memory_store(backend, os.path.join(base, name))
+
+            start = time.perf_counter()
+            for first in range(0, conversations, 10_000):
+                store.append_many(
+                    (conversation_id, [m for turn in range(turns) for m in _fake_turn(i, turn)])
+                    for i, conversation_id in enumerate(ids[first:first + 10_000], first)
+                )
+            populate_s = time.perf_counter() - start
+
+            sample = random.sample(ids, count)
+            cached = CachedMemoryStore(store)
+            append_s = load_s = cached_load_s = 0.0
+            for conversation_id in sample:
+                start = time.perf_counter()
+                store.append(conversation_id, _fake_turn(0, turns))
+                append_s += time.perf_counter() - start
+                start = time.perf_counter()
+                store.load(conversation_id)
+                load_s += time.perf_counter() - start
+
+                cached.load(conversation_id)
+                cached.append(conversation_id, _fake_turn(0, turns + 1))
+                start = time.perf_counter()
+                cached.load(conversation_id)
+                cached_load_s += time.perf_counter() - start
+
+            size = sum(
+                os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(base) for name in names
+            )
+            print(f"{backend:>8} | {populate_s:>12.1f} | {append_s / count * 1000:>16.2f} | "
+                  f"{load_s / count * 1000:>9.2f} | {cached_load_s / count * 1000:>16.3f} | {size / 1e6:>9.1f}")
+
+
+class _UnsafeJsonMemoryStore(JsonMemoryStore):
+    """The original save_conversation behaviour (no lock, in-place indent=2 rewrite), for the stress test."""
+
+    @contextmanager
+    def _locked(self):
+        yield
+
+    def _write_all(self, conversations: Dict[str, List[Message]]):
+        with open(self.path, 'w') as file:
+            json.dump(conversations, file, indent=2)
+
+
+def _stress_store(backend: str, path: str) -> MemoryStore:
+    if backend == "json-unsafe":
+        return _UnsafeJsonMemoryStore(path)
+    return get_memory_store(backend, path)
+
+
+def _stress_worker(backend: str, path: str, worker_id: int, threads: int, turns: int, conversations: int,
+                   failures: "multiprocessing.Value"):
+    """Append `threads * turns` turns from one process; threads share conversations."""
+    store = _stress_store(backend, path)
+
+    def chat(thread_id: int):
+        for turn in range(turns):
+            marker = f"w{worker_id}-t{thread_id}-{turn}"
+            conversation_id = f"conv{(worker_id * threads + thread_id) % conversations}"
+            try:
+                store.append(conversation_id, [
+                    {"role": "human", "content": marker, "timestamp": ""},
+                    {"role": "ai", "content": f"reply to {marker}", "timestamp": ""},
+                ])
+            except Exception:
+                with failures.get_lock():
+                    failures.value += 1
+
+    workers = [threading.Thread(target=chat, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def stress_test(backends: List[str], processes: int = 4, threads: int = 4, turns: int = 25, conversations: int = 4):
+    """
+    Append turns from many processes and threads at once, then count lost turns.
+
+    Args:
+        backends: Backends to test ("json", "sqlite", "jsonl"; "json-unsafe" is the original JSON writer)
+        processes: Number of writer processes
+        threads: Writer threads per process
+        turns: Turns appended per thread
+        conversations: Number of conversations the writers share
+    """
+    expected = {f"w{w}-t{t}-{i}" for w in range(processes) for t in range(threads) for i in range(turns)}
+    print(f"{processes} processes x {threads} threads x {turns} turns = {len(expected)} turns "
+          f"into {conversations} shared conversations")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            path = os.path.join(tmp, {"sqlite": "memory.db", "jsonl": "memory"}.get(backend, f"{backend}.json"))
+            _stress_store(backend, path)
+            failures = multiprocessing.Value("i", 0)
+
+            start = time.perf_counter()
+            workers = [
+                multiprocessing.Process(
+                    target=_stress_worker,
+                    args=(backend, path, worker_id, threads, turns, conversations, failures)
+                )
+                for worker_id in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+
+            try:
+                store = _stress_store(backend, path)
+                stored = [m for c in range(conversations) for m in store.load(f"conv{c}")]
+                corrupted = 0
+            except Exception:
+                stored, corrupted = [], 1
+            humans = [m["content"] for m in stored if m["role"] == "human"]
+            lost = len(expected - set(humans))
+            print(f"  {backend:>11}: {len(expected) / elapsed:8.0f} turns/s | lost turns: {lost} | "
+                  f"duplicated: {len(humans) - len(set(humans))} | failed appends: {failures.value} | "
+                  f"unreadable file: {'yes' if corrupted else 'no'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversation memory utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Copy conversation_memory.json into another backend")
+    migrate_parser.add_argument("--json", default="conversation_memory.json")
+    migrate_parser.add_argument("--backend", choices=["sqlite", "jsonl"], default="sqlite")
+    migrate_parser.add_argument("--path", help="Target file / directory")
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Compare per-turn latency of the backends")
+    benchmark_parser.add_argument("--conversations", type=int, default=100_000)
+    benchmark_parser.add_argument("--turns", type=int, default=3)
+
+    stress_parser = subparsers.add_parser("stress", help="Concurrent multiprocess append test")
+    stress_parser.add_argument("--backend", choices=["json", "json-unsafe", "sqlite", "jsonl", "all"], default="all")
+    stress_parser.add_argument("--processes", type=int, default=4)
+    stress_parser.add_argument("--threads", type=int, default=4)
+    stress_parser.add_argument("--turns", type=int, default=25)
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        target = get_memory_store(args.backend, args.path)
+        count = migrate_json_memory(args.json, target)
+        print(f"Migrated {count} conversations from {args.json} to {target.path}")
+    elif args.command == "benchmark":
+        benchmark(args.conversations, turns=args.turns)
+    else:
+        backends = ["json-unsafe", "json", "sqlite", "jsonl"] if args.backend == "all" else [args.backend]
+        stress_test(backends, args.processes, args.threads, args.turns)
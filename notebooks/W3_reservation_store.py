@@ -0,0 +1,705 @@
+"""
+Reservation storage backends for the W3 travel booking agent.
+
+This module provides:
+- ReservationStore: the interface used by the agent tools
+- CsvReservationStore: the original reservations.csv file
+- SqliteReservationStore: SQLite (WAL) with indexes on ID, destination, trip and booking date
+- Filtered, paginated queries: indexed SQL for SQLite, a Parquet copy with
+  predicate pushdown for the CSV backend
+- GroupCommitWriter: concurrent saves are batched into one durable (fsynced) write
+- A one-shot CSV -> SQLite migrator, a lookup benchmark and a multiprocess write stress test
+
+Usage:
+    python W3_reservation_store.py migrate --csv reservations.csv --db reservations.db
+    python W3_reservation_store.py benchmark --rows 1000000
+    python W3_reservation_store.py query-benchmark --rows 1000000
+    python W3_reservation_store.py stress --backend csv --processes 4 --threads 8
+"""
+
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+FIELDNAMES = ["reservation_id", "reservation_date", "planned_trip_date",
+              "trip_destination", "description"]
+
+# The Parquet copy of the CSV is rebuilt only once the rows appended after it
+# exceed this fraction of the CSV (and at least COLUMNAR_MIN_DELTA_BYTES);
+# until then queries read just those new rows and merge them in
+COLUMNAR_REBUILD_FRACTION = 0.1
+COLUMNAR_MIN_DELTA_BYTES = 1 << 20
+
+
+class ReservationStore:
+    """Interface for reservation storage backends."""
+
+    def save(self, reservation: Dict[str, str]):
+        """Persist a single reservation (a dict with all FIELDNAMES)."""
+        raise NotImplementedError
+
+    def save_many(self, reservations: Iterable[Dict[str, str]]):
+        """Persist many reservations; backends may override this with a bulk write."""
+        for reservation in reservations:
+            self.save(reservation)
+
+    def get(self, reservation_id: str) -> Optional[Dict[str, str]]:
+        """Return the reservation with the given ID, or None if it does not exist."""
+        raise NotImplementedError
+
+    def version(self):
+        """
+        Token that changes whenever any process writes to the store.
+
+        Cheap enough to call before every cached read (see W3_tool_cache.py).
+        """
+        raise NotImplementedError
+
+    def query(
+        self,
+        destination: Optional[str] = None,
+        trip_date_from: Optional[str] = None,
+        trip_date_to: Optional[str] = None,
+        booked_from: Optional[str] = None,
+        booked_to: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Filter reservations, ordered by trip date and ID.
+
+        Args:
+            destination: Case-insensitive prefix of trip_destination ("paris" matches "Paris, France")
+            trip_date_from: Earliest planned trip date (YYYY-MM-DD, inclusive)
+            trip_date_to: Latest planned trip date (inclusive)
+            booked_from: Earliest reservation (booking) date (inclusive)
+            booked_to: Latest reservation date (inclusive)
+            limit: Page size
+            offset: Number of matches to skip
+
+        Returns:
+            (reservations on the requested page, total number of matches)
+        """
+        raise NotImplementedError
+
+
+class GroupCommitWriter:
+    """
+    Leader/follower group commit.
+
+    The first thread to submit becomes the leader and writes everything queued
+    so far in one call; threads arriving meanwhile wait and are written by the
+    next leader. `submit` returns only after its rows are durable.
+    """
+
+    def __init__(self, write_batch: Callable[[List[Dict[str, str]]], None]):
+        """
+        Args:
+            write_batch: Function that durably writes a list of reservations
+        """
+        self._write_batch = write_batch
+        self._condition = threading.Condition()
+        self._pending: List[dict] = []
+        self._flushing = False
+
+    def submit(self, reservations: List[Dict[str, str]]):
+        """Queue reservations and block until they have been written."""
+        entry = {"rows": reservations, "done": False, "error": None}
+        with self._condition:
+            self._pending.append(entry)
+            while not entry["done"]:
+                if self._flushing:
+                    self._condition.wait()
+                    continue
+
+                self._flushing = True
+                batch, self._pending = self._pending, []
+                error = None
+                self._condition.release()
+                try:
+                    self._write_batch([row for queued in batch for row in queued["rows"]])
+                except Exception as e:
+                    error = e
+                finally:
+                    self._condition.acquire()
+                for queued in batch:
+                    queued["done"] = True
+                    queued["error"] = error
+                self._flushing = False
+                self._condition.notify_all()
+
+        if entry["error"] is not None:
+            raise entry["error"]
+
+
+class CsvReservationStore(ReservationStore):
+    """Reservations kept in a CSV file (one row per booking)."""
+
+    def __init__(self, path: str = "reservations.csv", group_commit: bool = True):
+        """
+        Args:
+            path: CSV file location
+            group_commit: Batch concurrent saves into one write + fsync
+        """
+        self.path = path
+        self._writer = GroupCommitWriter(self._append_rows) if group_commit else None
+
+    def initialize(self):
+        """Create the CSV file with a header row if it doesn't exist."""
+        if not os.path.exists(self.path):
+            self._append_rows([])
+
+    def _append_rows(self, reservations: List[Dict[str, str]]):
+        """Append rows under an exclusive file lock and fsync before returning."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([reservation[field] for field in FIELDNAMES] for reservation in reservations)
+
+        with open(self.path, 'a', newline='') as file:
+            if fcntl:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            # Header is written under the lock so parallel processes can't both add it
+            if file.seek(0, os.SEEK_END) == 0:
+                csv.writer(file).writerow(FIELDNAMES)
+            file.write(buffer.getvalue())
+            file.flush()
+            os.fsync(file.fileno())
+
+    def save(self, reservation: Dict[str, str]):
+        self.save_many([reservation])
+
+    def save_many(self, reservations: Iterable[Dict[str, str]]):
+        if self._writer:
+            self._writer.submit(list(reservations))
+        else:
+            self._append_rows(list(reservations))
+
+    def version(self) -> Optional[Tuple[int, int, int]]:
+        # Every save appends, so the size (and mtime) change on each write
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def get(self, reservation_id: str) -> Optional[Dict[str, str]]:
+        self.initialize()
+        # Linear scan, stops at the first match
+        with open(self.path, 'r', newline='') as file:
+            if fcntl:
+                fcntl.flock(file, fcntl.LOCK_SH)
+            for row in csv.DictReader(file):
+                if row["reservation_id"] == reservation_id:
+                    return row
+        return None
+
+    @property
+    def columnar_path(self) -> str:
+        """Parquet copy of the CSV used by `query`."""
+        return os.path.splitext(self.path)[0] + ".parquet"
+
+    def _build_columnar(self):
+        """
+        Rebuild the Parquet copy from the whole CSV.
+
+        Rows are sorted by trip date, so row-group statistics let date-range
+        filters skip most of the file. The metadata records the CSV's inode and
+        the byte length covered, so later appends can be read as a delta.
+        """
+        with open(self.path, 'rb') as file:
+            if fcntl:
+                fcntl.flock(file, fcntl.LOCK_SH)
+            # Writers append whole rows under LOCK_EX, so this length ends on a row boundary
+            covered = file.seek(0, os.SEEK_END)
+            file.seek(0)
+            table = pa_csv.read_csv(
+                io.BytesIO(file.read(covered)),
+                convert_options=pa_csv.ConvertOptions(column_types={field: pa.string() for field in FIELDNAMES})
+            )
+            inode = os.fstat(file.fileno()).st_ino
+        table = table.sort_by([("planned_trip_date", "ascending"), ("reservation_id", "ascending")])
+        table = table.replace_schema_metadata({"source_inode": str(inode), "source_bytes": str(covered)})
+
+        tmp_path = f"{self.columnar_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(table, tmp_path, row_group_size=100_000)
+        os.replace(tmp_path, self.columnar_path)
+
+    def _read_delta(self, start: int) -> pa.Table:
+        """Rows appended to the CSV after byte offset `start`."""
+        with open(self.path, 'rb') as file:
+            if fcntl:
+                fcntl.flock(file, fcntl.LOCK_SH)
+            file.seek(start)
+            data = file.read()
+        if not data:
+            return pa.table({field: pa.array([], pa.string()) for field in FIELDNAMES})
+        return pa_csv.read_csv(
+            io.BytesIO(data),
+            read_options=pa_csv.ReadOptions(column_names=FIELDNAMES),
+            convert_options=pa_csv.ConvertOptions(column_types={field: pa.string() for field in FIELDNAMES})
+        )
+
+    def _refresh_columnar(self) -> Tuple[str, Optional[pa.Table]]:
+        """
+        Bring the Parquet copy up to date with the CSV.
+
+        Saves only append to the CSV, so rows added since the last build are read
+        from the tail of the file instead of rebuilding everything. The copy is
+        rebuilt once that tail grows past COLUMNAR_REBUILD_FRACTION of the file, or
+        when the CSV was replaced or truncated.
+
+        Returns:
+            (Parquet path, rows appended after it or None)
+        """
+        self.initialize()
+        stat = os.stat(self.path)
+        covered = None
+        if os.path.exists(self.columnar_path):
+            metadata = pq.read_schema(self.columnar_path).metadata or {}
+            if metadata.get(b"source_inode") == str(stat.st_ino).encode():
+                covered = int(metadata.get(b"source_bytes", b"-1"))
+
+        delta_bytes = stat.st_size - covered if covered is not None else -1
+        if covered is None or delta_bytes < 0 or \
+                delta_bytes > max(COLUMNAR_MIN_DELTA_BYTES, COLUMNAR_REBUILD_FRACTION * covered):
+            self._build_columnar()
+            return self.columnar_path, None
+        if delta_bytes == 0:
+            return self.columnar_path, None
+        return self.columnar_path, self._read_delta(covered)
+
+    def query(
+        self,
+        destination: Optional[str] = None,
+        trip_date_from: Optional[str] = None,
+        trip_date_to: Optional[str] = None,
+        booked_from: Optional[str] = None,
+        booked_to: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, str]], int]:
+        # Date filters are pushed down to Parquet row groups; the destination
+        # prefix is evaluated on the remaining batches
+        conditions = []
+        if trip_date_from:
+            conditions.append(ds.field("planned_trip_date") >= trip_date_from)
+        if trip_date_to:
+            conditions.append(ds.field("planned_trip_date") <= trip_date_to)
+        if booked_from:
+            conditions.append(ds.field("reservation_date") >= booked_from)
+        if booked_to:
+            conditions.append(ds.field("reservation_date") <= booked_to)
+        if destination:
+            conditions.append(pc.starts_with(pc.utf8_lower(ds.field("trip_destination")), destination.lower()))
+
+        columnar_path, delta = self._refresh_columnar()
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        table = ds.dataset(columnar_path, format="parquet").to_table(filter=expression)
+
+        # The file is already sorted by (trip date, ID), so filtered rows are in order
+        if delta is None or delta.num_rows == 0:
+            return table.slice(offset, limit).to_pylist(), table.num_rows
+
+        # Merge the matching new rows into the first offset + limit rows of the copy
+        new_rows = ds.dataset(delta).to_table(filter=expression)
+        total = table.num_rows + new_rows.num_rows
+        head = pa.concat_tables([table.slice(0, offset + limit), new_rows])
+        head = head.sort_by([("planned_trip_date", "ascending"), ("reservation_id", "ascending")])
+        return head.slice(offset, limit).to_pylist(), total
+
+
+class SqliteReservationStore(ReservationStore):
+    """Reservations kept in SQLite with a primary key on reservation_id."""
+
+    def __init__(self, path: str = "reservations.db", group_commit: bool = True):
+        """
+        Args:
+            path: SQLite database location
+            group_commit: Batch concurrent saves into one transaction
+        """
+        self.path = path
+        self._writer = GroupCommitWriter(self._insert_rows) if group_commit else None
+        self._local = threading.local()
+        self._version_conn: Optional[sqlite3.Connection] = None
+        self._version_lock = threading.Lock()
+        conn = self._connect()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reservations (
+                reservation_id TEXT PRIMARY KEY,
+                reservation_date TEXT,
+                planned_trip_date TEXT,
+                trip_destination TEXT,
+                description TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_reservations_destination ON reservations(trip_destination);
+            CREATE INDEX IF NOT EXISTS idx_reservations_trip_date ON reservations(planned_trip_date);
+            CREATE INDEX IF NOT EXISTS idx_reservations_destination_nocase
+                ON reservations(trip_destination COLLATE NOCASE, planned_trip_date);
+            CREATE INDEX IF NOT EXISTS idx_reservations_booking_date ON reservations(reservation_date);
+            """
+        )
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are not shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # FULL syncs the WAL on every commit, so saved bookings survive power loss
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def version(self) -> int:
+        # data_version is per connection and ignores the connection's own commits, so it
+        # is read from one connection that never writes (it sees this process's writes too)
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def save(self, reservation: Dict[str, str]):
+        self.save_many([reservation])
+
+    def save_many(self, reservations: Iterable[Dict[str, str]]):
+        if self._writer:
+            self._writer.submit(list(reservations))
+        else:
+            self._insert_rows(list(reservations))
+
+    def _insert_rows(self, reservations: List[Dict[str, str]]):
+        """Insert rows in a single transaction."""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO reservations ({', '.join(FIELDNAMES)}) "
+                f"VALUES ({', '.join('?' for _ in FIELDNAMES)})",
+                ([reservation[field] for field in FIELDNAMES] for reservation in reservations)
+            )
+
+    def get(self, reservation_id: str) -> Optional[Dict[str, str]]:
+        row = self._connect().execute(
+            "SELECT * FROM reservations WHERE reservation_id = ?", (reservation_id,)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def query(
+        self,
+        destination: Optional[str] = None,
+        trip_date_from: Optional[str] = None,
+        trip_date_to: Optional[str] = None,
+        booked_from: Optional[str] = None,
+        booked_to: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, str]], int]:
+        conditions, params = [], []
+        if destination:
+            # Prefix LIKE (case-insensitive by default) can use the NOCASE destination index
+            escaped = destination.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("trip_destination LIKE ? ESCAPE '\\'")
+            params.append(escaped + "%")
+        for column, operator, value in (
+            ("planned_trip_date", ">=", trip_date_from),
+            ("planned_trip_date", "<=", trip_date_to),
+            ("reservation_date", ">=", booked_from),
+            ("reservation_date", "<=", booked_to),
+        ):
+            if value:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM reservations {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM reservations {where} ORDER BY planned_trip_date, reservation_id LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return [dict(row) for row in rows], total
+
+
+def get_reservation_store(backend: Optional[str] = None, path: Optional[str] = None) -> ReservationStore:
+    """
+    Create the reservation store selected by arguments or environment variables.
+
+    Args:
+        backend: "csv" or "sqlite" (defaults to RESERVATIONS_BACKEND, then "csv")
+        path: File path (defaults to RESERVATIONS_PATH, then reservations.csv / reservations.db)
+
+    Returns:
+        ReservationStore instance
+    """
+    backend = backend or os.getenv("RESERVATIONS_BACKEND", "csv")
+    path = path or os.getenv("RESERVATIONS_PATH")
+    if backend == "csv":
+        return CsvReservationStore(path or "reservations.csv")
+    if backend == "sqlite":
+        return SqliteReservationStore(path or "reservations.db")
+    raise ValueError(f"Unknown reservations backend: {backend}")
+
+
+def migrate_csv_to_sqlite(csv_path: str, sqlite_path: str, batch_size: int = 10000) -> int:
+    """
+    Copy every reservation from a CSV file into a SQLite store.
+
+    Args:
+        csv_path: Existing reservations.csv
+        sqlite_path: Target SQLite database (created if missing)
+        batch_size: Rows inserted per transaction
+
+    Returns:
+        Number of migrated reservations
+    """
+    store = SqliteReservationStore(sqlite_path)
+    migrated = 0
+    batch: List[Dict[str, str]] = []
+    with open(csv_path, 'r', newline='') as file:
+        for row in csv.DictReader(file):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                store.save_many(batch)
+                migrated += len(batch)
+                batch = []
+    if batch:
+        store.save_many(batch)
+        migrated += len(batch)
+    return migrated
+
+
+def _fake_reservations(count: int) -> Iterable[Dict[str, str]]:
+    destinations = ["Paris, France", "Rome, Italy", "Athens, Greece", "Lisbon, Portugal", "Oslo, Norway"]
+    for i in range(count):
+        yield {
+            "reservation_id": f"{i:08x}",
+            "reservation_date": "2025-01-01",
+            "planned_trip_date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "trip_destination": destinations[i % len(destinations)],
+            "description": "Benchmark reservation"
+        }
+
+
+def benchmark(sizes: List[int], lookups: int = 1000, csv_max_rows: int = 100_000):
+    """
+    Measure average lookup latency of both backends for growing table sizes.
+
+    Args:
+        sizes: Numbers of reservations to test
+        lookups: Random lookups per measurement
+        csv_max_rows: Skip the CSV backend above this size (its scan is linear)
+    """
+    print(f"{'rows':>10} | {'sqlite lookup (us)':>18} | {'csv lookup (us)':>15}")
+    print("-" * 51)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            ids = [f"{random.randrange(size):08x}" for _ in range(lookups)]
+
+            sqlite_store = SqliteReservationStore(os.path.join(tmp, f"bench_{size}.db"))
+            sqlite_store.save_many(_fake_reservations(size))
+            start = time.perf_counter()
+            for reservation_id in ids:
+                sqlite_store.get(reservation_id)
+            sqlite_us = (time.perf_counter() - start) / lookups * 1e6
+
+            csv_result = "skipped"
+            if size <= csv_max_rows:
+                csv_store = CsvReservationStore(os.path.join(tmp, f"bench_{size}.csv"))
+                csv_store.initialize()
+                with open(csv_store.path, 'a', newline='') as file:
+                    writer = csv.writer(file)
+                    writer.writerows([r[field] for field in FIELDNAMES] for r in _fake_reservations(size))
+                csv_lookups = ids[:max(1, lookups // 100)]
+                start = time.perf_counter()
+                for reservation_id in csv_lookups:
+                    csv_store.get(reservation_id)
+                csv_result = f"{(time.perf_counter() - start) / len(csv_lookups) * 1e6:.1f}"
+
+            print(f"{size:>10} | {sqlite_us:>18.1f} | {csv_result:>15}")
+
+
+def benchmark_queries(sizes: List[int], repeats: int = 20):
+    """
+    Measure filtered, paginated query latency ("Paris trips in December", page 1 and 5).
+
+    Args:
+        sizes: Numbers of reservations to test
+        repeats: Queries per measurement
+    """
+    query = {"destination": "paris", "trip_date_from": "2025-12-01", "trip_date_to": "2025-12-31"}
+    print(f"{'rows':>10} | {'matches':>8} | {'sqlite (ms)':>11} | {'parquet build (s)':>17} | {'parquet (ms)':>12} | "
+          f"{'after a save (ms)':>17}")
+    print("-" * 92)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            sqlite_store = SqliteReservationStore(os.path.join(tmp, f"query_{size}.db"))
+            sqlite_store.save_many(_fake_reservations(size))
+
+            csv_store = CsvReservationStore(os.path.join(tmp, f"query_{size}.csv"))
+            csv_store.initialize()
+            with open(csv_store.path, 'a', newline='') as file:
+                csv.writer(file).writerows([r[field] for field in FIELDNAMES] for r in _fake_reservations(size))
+            start = time.perf_counter()
+            csv_store._refresh_columnar()
+            build_s = time.perf_counter() - start
+
+            timings = {}
+            for name, store in (("sqlite", sqlite_store), ("parquet", csv_store)):
+                start = time.perf_counter()
+                for i in range(repeats):
+                    _, total = store.query(**query, limit=20, offset=0 if i % 2 == 0 else 80)
+                timings[name] = (time.perf_counter() - start) / repeats * 1000
+
+            # A booking between searches: new rows are merged in, the copy isn't rebuilt
+            start = time.perf_counter()
+            for i in range(repeats):
+                csv_store.save({"reservation_id": f"new-{i:04d}", "reservation_date": "2025-06-01",
+                                "planned_trip_date": "2025-12-15", "trip_destination": "Paris, France",
+                                "description": "Benchmark booking"})
+                csv_store.query(**query, limit=20)
+            after_save_ms = (time.perf_counter() - start) / repeats * 1000
+
+            print(f"{size:>10} | {total:>8} | {timings['sqlite']:>11.2f} | {build_s:>17.2f} | "
+                  f"{timings['parquet']:>12.2f} | {after_save_ms:>17.2f}")
+
+
+def _create_store(backend: str, path: str, group_commit: bool) -> ReservationStore:
+    if backend == "csv":
+        return CsvReservationStore(path, group_commit=group_commit)
+    return SqliteReservationStore(path, group_commit=group_commit)
+
+
+def _stress_worker(backend: str, path: str, group_commit: bool, worker_id: int, threads: int, per_thread: int):
+    """Book `threads * per_thread` reservations from one process."""
+    store = _create_store(backend, path, group_commit)
+
+    def book(thread_id: int):
+        for i in range(per_thread):
+            store.save({
+                "reservation_id": f"{worker_id:03d}-{thread_id:03d}-{i:06d}",
+                "reservation_date": "2025-01-01",
+                "planned_trip_date": "2025-12-24",
+                "trip_destination": "Paris, France",
+                "description": f"Stress test booking, \"worker\" {worker_id}, thread {thread_id}"
+            })
+
+    workers = [threading.Thread(target=book, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def _read_back(backend: str, path: str) -> List[Dict[str, str]]:
+    if backend == "csv":
+        with open(path, 'r', newline='') as file:
+            return list(csv.DictReader(file))
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return [dict(row) for row in conn.execute("SELECT * FROM reservations")]
+
+
+def stress_test(backend: str = "csv", processes: int = 4, threads: int = 8, per_thread: int = 50):
+    """
+    Book reservations from many processes and threads at once, then verify the file.
+
+    Runs once with one write + fsync per booking and once with group commit,
+    and reports throughput and any lost or corrupted rows.
+
+    Args:
+        backend: "csv" or "sqlite"
+        processes: Number of writer processes
+        threads: Writer threads per process
+        per_thread: Bookings per thread
+    """
+    expected = processes * threads * per_thread
+    print(f"{backend}: {processes} processes x {threads} threads x {per_thread} bookings = {expected}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for group_commit in (False, True):
+            path = os.path.join(tmp, f"stress_{group_commit}.{'csv' if backend == 'csv' else 'db'}")
+            _create_store(backend, path, group_commit)  # create the file / schema up front
+
+            start = time.perf_counter()
+            workers = [
+                multiprocessing.Process(
+                    target=_stress_worker,
+                    args=(backend, path, group_commit, worker_id, threads, per_thread)
+                )
+                for worker_id in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+
+            rows = _read_back(backend, path)
+            ids = {row["reservation_id"] for row in rows}
+            corrupted = sum(
+                1 for row in rows
+                if None in row or any(row.get(field) is None for field in FIELDNAMES)
+                or not row["description"].startswith("Stress test booking")
+            )
+            mode = "group commit" if group_commit else "fsync per row"
+            print(
+                f"  {mode:>13}: {expected / elapsed:8.0f} bookings/s | rows: {len(rows)} | "
+                f"missing: {expected - len(ids)} | duplicated: {len(rows) - len(ids)} | corrupted: {corrupted}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reservation store utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Copy reservations.csv into a SQLite store")
+    migrate_parser.add_argument("--csv", default="reservations.csv")
+    migrate_parser.add_argument("--db", default="reservations.db")
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Compare lookup latency of the backends")
+    benchmark_parser.add_argument("--rows", type=int, default=1_000_000, help="Largest table size to test")
+    benchmark_parser.add_argument("--lookups", type=int, default=1000)
+
+    query_parser = subparsers.add_parser("query-benchmark", help="Compare filtered query latency of the backends")
+    query_parser.add_argument("--rows", type=int, default=1_000_000, help="Largest table size to test")
+
+    stress_parser = subparsers.add_parser("stress", help="Concurrent multiprocess write test")
+    stress_parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    stress_parser.add_argument("--processes", type=int, default=4)
+    stress_parser.add_argument("--threads", type=int, default=8)
+    stress_parser.add_argument("--per-thread", type=int, default=50)
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        count = migrate_csv_to_sqlite(args.csv, args.db)
+        print(f"Migrated {count} reservations from {args.csv} to {args.db}")
+    elif args.command == "benchmark":
+        sizes = [size for size in (1_000, 10_000, 100_000, 1_000_000) if size < args.rows] + [args.rows]
+        benchmark(sizes, lookups=args.lookups)
+    elif args.command == "query-benchmark":
+        sizes = [size for size in (10_000, 100_000) if size < args.rows] + [args.rows]
+        benchmark_queries(sizes)
+    else:
+        stress_test(args.backend, args.processes, args.threads, args.per_thread)
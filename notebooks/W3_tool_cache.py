@@ -0,0 +1,135 @@
+"""
+Result cache for idempotent agent tools.
+
+This module provides helper functions for:
+- Memoizing tool results by tool name and arguments (LRU-bounded, thread-safe)
+- Invalidating cached results when a write tool changes the underlying data
+- Keying results by a data version, so writes from other processes are not missed
+- Hit-rate metrics for the agent's verbose trace
+
+Usage:
+    tool_cache = ToolResultCache(max_size=1024, version=reservation_store.version)
+
+    @tool
+    @tool_cache.idempotent()
+    def read_reservation(reservation_id: str) -> str:
+        ...
+
+    # in a write tool
+    tool_cache.invalidate("read_reservation", reservation_id=reservation_id)
+"""
+
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class ToolResultCache:
+    """Process-wide LRU cache of tool results, shared by all agent sessions."""
+
+    def __init__(self, max_size: int = 1024, version: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            max_size: Maximum number of cached results; least recently used are evicted
+            version: Optional callable returning the current version of the underlying
+                data; it is part of every key, so results read before a write made by
+                another process are never returned (they age out of the LRU)
+        """
+        self.max_size = max_size
+        self.version = version
+        self._entries: "OrderedDict[Tuple[str, Tuple, Any], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def idempotent(self, should_cache: Optional[Callable[[Any], bool]] = None) -> Callable:
+        """
+        Decorator for tool functions whose result depends only on their arguments.
+
+        Apply it below `@tool` so the tool schema is still built from the
+        original signature and docstring.
+
+        Args:
+            should_cache: Optional predicate on the result; results for which it
+                returns False (e.g. transient errors) are not stored
+
+        Returns:
+            Decorator wrapping the function with a cache lookup
+        """
+        def decorator(func: Callable) -> Callable:
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                # Version read before the call: a write during the call makes the next lookup miss
+                version = self.version() if self.version else None
+                key = (func.__name__, tuple(sorted(bound.arguments.items())), version)
+
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return self._entries[key]
+                    self.misses += 1
+
+                result = func(*args, **kwargs)
+                if should_cache is None or should_cache(result):
+                    self._store(key, result)
+                return result
+
+            return wrapper
+
+        return decorator
+
+    def _store(self, key: Tuple[str, Tuple, Any], result: Any):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tool_name: Optional[str] = None, **arguments):
+        """
+        Drop cached results.
+
+        Args:
+            tool_name: Only drop results of this tool (None drops everything)
+            **arguments: Only drop results called with these argument values
+        """
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (tool_name is None or key[0] == tool_name)
+                and all(dict(key[1]).get(name) == value for name, value in arguments.items())
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def format_stats(self) -> str:
+        """One-line summary for verbose traces."""
+        stats = self.stats()
+        return (
+            f"Tool cache: {stats['hits']} hits / {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['size']} entries"
+        )
@@ -0,0 +1,517 @@
+"""
+Deterministic OpenAI-compatible mock server for offline load testing.
+
+This module provides helper functions for:
+- Chat completions (plain, JSON and tool calls; streaming and non-streaming)
+- Embeddings (seeded unit vectors, float or base64 encoding)
+- Audio transcriptions (Whisper) and speech (TTS, WAV/PCM audio)
+- Configurable latency, jitter and error injection (429 / 500)
+- Scripted responses matched by regex on the last message
+
+Responses depend only on the request content, so repeated runs are
+reproducible; injected errors and latency come from a seeded RNG.
+
+Every client in the repo (ChatOpenAI, OpenAIEmbeddings, openai.OpenAI) reads
+OPENAI_BASE_URL, so no code changes are needed to point them here:
+
+    python notebooks/bonus/W4_mock_openai_server.py --port 8001 --latency-ms 50 --error-rate 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=mock python notebooks/W3-agent_with_tools.py
+
+Script file (JSONL), first matching rule wins:
+    {"match": "status of reservation", "tool_calls": [{"name": "read_reservation", "arguments": {"reservation_id": "9c89a904"}}]}
+    {"match": "(?i)hello", "content": "Hi! How can I help you with your trip?"}
+
+The Realtime (websocket) API used by W4_realtime_voice_agent.py is not mocked.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+import wave
+from collections import Counter
+from email.parser import BytesParser
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+DEFAULT_TRANSCRIPT = "I want to book a trip to Paris, France on 2025-12-24 for two people."
+SPEECH_SAMPLE_RATE = 24000
+
+STOPWORDS = {"the", "and", "for", "with", "this", "that", "from", "your", "you", "are", "was", "what", "want"}
+# Requests with these verbs go to a tool whose name/description mentions one (the write path)
+WRITE_VERBS = re.compile(r"\b(book|reserve|save)\b", re.IGNORECASE)
+WRITE_TOOL_WORDS = re.compile(r"\b(save|book|reserve|create)\b", re.IGNORECASE)
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _count_tokens(text: str) -> int:
+    """Rough token estimate (4 characters per token); the mock needs no tokenizer download."""
+    return max(1, len(text) // 4)
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+class MockBehaviour:
+    """Latency, error injection and scripted rules shared by all endpoints."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        token_latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: Tuple[int, ...] = (429, 500),
+        seed: int = 0,
+        script: Optional[List[Dict[str, Any]]] = None,
+        transcript: str = DEFAULT_TRANSCRIPT
+    ):
+        """
+        Args:
+            latency_ms: Mean delay before each response
+            jitter_ms: Standard deviation of the delay
+            token_latency_ms: Delay between streamed chunks
+            error_rate: Probability of answering a request with an injected error
+            error_statuses: HTTP statuses to inject (picked at random)
+            seed: Seed of the latency / error RNG
+            script: Scripted rules ({"match", "content" and/or "tool_calls"})
+            transcript: Text returned by the transcription endpoint
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_latency_ms = token_latency_ms
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.script = [dict(rule, pattern=re.compile(rule["match"])) for rule in (script or [])]
+        self.transcript = transcript
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    async def before_response(self, endpoint: str) -> Optional[JSONResponse]:
+        """Count the request, sleep the injected latency and maybe return an injected error."""
+        with self._lock:
+            self.requests[endpoint] += 1
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) if self.latency_ms else 0.0
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            status = self._rng.choice(self.error_statuses) if fail else None
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if status is None:
+            return None
+
+        with self._lock:
+            self.errors[status] += 1
+        error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": f"Injected mock error ({status})", "type": error_type,
+                               "param": None, "code": error_type}}
+        )
+
+    def match_script(self, text: str) -> Optional[Dict[str, Any]]:
+        for rule in self.script:
+            if rule["pattern"].search(text):
+                return rule
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Chat completions
+# ---------------------------------------------------------------------------
+
+def _tool_call(name: str, arguments: Dict[str, Any], seed_text: str) -> Dict[str, Any]:
+    return {
+        "id": "call_" + _digest(seed_text, name, arguments)[:24],
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)}
+    }
+
+
+def _find_ids(text: str) -> List[str]:
+    """Reservation-style IDs: 8-character hex tokens (as produced by save_reservation)."""
+    return re.findall(r"\b(?=[0-9a-f]*\d)[0-9a-f]{8}\b", text)
+
+
+def _fill_arguments(schema: Dict[str, Any], text: str, identifier: Optional[str]) -> Dict[str, Any]:
+    """
+    Build tool arguments from a JSON schema with values taken from the user text where possible.
+
+    Only required parameters are filled; optional ones (filters, paging) keep their defaults.
+    """
+    properties = schema.get("properties", {})
+    names = schema.get("required", [])
+    dates = re.findall(r"\d{4}-\d{2}-\d{2}", text)
+    place = re.search(r"\bto ([A-Z][\w-]*(?:,? [A-Z][\w-]*)*)", text)
+
+    arguments: Dict[str, Any] = {}
+    for name in names:
+        kind = properties.get(name, {}).get("type", "string")
+        lowered = name.lower()
+        if kind == "boolean":
+            arguments[name] = True
+        elif kind in ("integer", "number"):
+            arguments[name] = 1
+        elif kind == "array":
+            arguments[name] = []
+        elif kind == "object":
+            arguments[name] = {}
+        elif "date" in lowered:
+            arguments[name] = dates.pop(0) if dates else "2025-12-24"
+        elif lowered.endswith("id"):
+            arguments[name] = identifier or _digest(text)[:8]
+        elif any(word in lowered for word in ("destination", "location", "city", "place")):
+            arguments[name] = place.group(1) if place else "Paris, France"
+        else:
+            arguments[name] = text[:200]
+    return arguments
+
+
+def _choose_tool_calls(tools: List[Dict[str, Any]], text: str) -> List[Dict[str, Any]]:
+    """
+    Pick the tool for the text: one call per ID mentioned, the write tool for booking
+    requests, otherwise the tool whose name/description overlaps most with the text.
+    """
+    functions = [tool["function"] for tool in tools if tool.get("type") == "function"]
+    if not functions:
+        return []
+
+    ids = _find_ids(text)
+    id_tools = [f for f in functions if any(p.lower().endswith("id") for p in f.get("parameters", {}).get("properties", {}))]
+    if ids and id_tools:
+        function = id_tools[0]
+        return [_tool_call(function["name"], _fill_arguments(function.get("parameters", {}), text, i), text) for i in ids]
+
+    if WRITE_VERBS.search(text):
+        write_tools = [
+            f for f in functions
+            if WRITE_TOOL_WORDS.search(f["name"].replace("_", " ") + " " + f.get("description", ""))
+        ]
+        if write_tools:
+            function = write_tools[0]
+            return [_tool_call(function["name"], _fill_arguments(function.get("parameters", {}), text, None), text)]
+
+    words = {w for w in re.findall(r"[a-z]+", text.lower()) if len(w) > 3 and w not in STOPWORDS}
+
+    def overlap(function):
+        described = set(re.findall(r"[a-z]+", (function["name"].replace("_", " ") + " " + function.get("description", "")).lower()))
+        return len(words & described)
+
+    function = max(functions, key=overlap)  # ties keep the first tool
+    return [_tool_call(function["name"], _fill_arguments(function.get("parameters", {}), text, None), text)]
+
+
+def _json_reply(prompt: str) -> Optional[str]:
+    """Answer prompts that ask for JSON with an object/array following the format described in them."""
+    if "json" not in prompt.lower():
+        return None
+
+    fields = re.findall(r'"(\w+)"\s*:\s*(boolean|bool|string|str|integer|int|number)', prompt)
+    if not fields:
+        return json.dumps({"response": "Mock response"})
+
+    def value(name, kind, item_text, item_id=None):
+        if name == "id" and item_id is not None:
+            return item_id
+        if kind in ("boolean", "bool"):
+            score = re.search(r'(?:[Ss]core[^:\n]*:\s*|"score":\s*)(\d)', item_text)
+            return int(score.group(1)) >= 3 if score else int(_digest(item_text)[:2], 16) % 2 == 0
+        if kind in ("integer", "int", "number"):
+            return 1
+        return f"Mock {name} for: {item_text[:80].strip()}"
+
+    if re.search(r"JSON array", prompt, re.IGNORECASE):
+        lines = [line for line in prompt.splitlines() if line.startswith('{"id"')]
+        items = []
+        for line in lines:
+            item_id = json.loads(line)["id"]
+            items.append({name: value(name, kind, line, item_id) for name, kind in fields})
+        return json.dumps(items)
+    return json.dumps({name: value(name, kind, prompt) for name, kind in fields})
+
+
+def chat_reply(body: Dict[str, Any], behaviour: MockBehaviour) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Decide the assistant message for a chat request.
+
+    Args:
+        body: Chat completions request body
+        behaviour: Mock configuration (scripted rules)
+
+    Returns:
+        (content, tool_calls)
+    """
+    messages = body.get("messages", [])
+    last = messages[-1] if messages else {"role": "user", "content": ""}
+    text = _message_text(last)
+
+    rule = behaviour.match_script(text)
+    if rule:
+        tool_calls = [_tool_call(call["name"], call.get("arguments", {}), text) for call in rule.get("tool_calls", [])]
+        return rule.get("content", ""), tool_calls
+
+    if last.get("role") == "tool":
+        results = []
+        for message in reversed(messages):
+            if message.get("role") != "tool":
+                break
+            results.append(_message_text(message))
+        return "Here is what I found:\n" + "\n\n".join(reversed(results)), []
+
+    tools = body.get("tools") or []
+    if tools and last.get("role") == "user":
+        return "", _choose_tool_calls(tools, text)
+
+    prompt = "\n".join(_message_text(message) for message in messages)
+    json_content = _json_reply(prompt)
+    if json_content is not None:
+        return json_content, []
+    return f"Mock reply ({_digest(text)[:8]}): {text[:200]}", []
+
+
+def _chat_usage(body: Dict[str, Any], content: str, tool_calls: List[Dict[str, Any]]) -> Dict[str, int]:
+    prompt_tokens = sum(_count_tokens(_message_text(m)) + 4 for m in body.get("messages", []))
+    completion_tokens = _count_tokens(content + json.dumps(tool_calls)) if (content or tool_calls) else 0
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+async def _stream_chat(body, content, tool_calls, behaviour, completion_id, created):
+    model = body.get("model", "mock")
+
+    def chunk(delta, finish_reason=None, usage=None):
+        payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                   "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        if usage is not None:
+            payload["choices"] = []
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for piece in re.findall(r"\S+\s*|\s+", content):
+        if behaviour.token_latency_ms:
+            await asyncio.sleep(behaviour.token_latency_ms / 1000)
+        yield chunk({"content": piece})
+    for index, call in enumerate(tool_calls):
+        yield chunk({"tool_calls": [dict(call, index=index)]})
+    yield chunk({}, finish_reason="tool_calls" if tool_calls else "stop")
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield chunk({}, usage=_chat_usage(body, content, tool_calls))
+    yield "data: [DONE]\n\n"
+
+
+# ---------------------------------------------------------------------------
+# Embeddings and audio
+# ---------------------------------------------------------------------------
+
+def embed(text: Any, dimensions: int) -> np.ndarray:
+    """Seeded unit vector for a text (or token list), identical across runs."""
+    seed = int(_digest(text)[:16], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def synthesize_wav(text: str, sample_rate: int = SPEECH_SAMPLE_RATE) -> bytes:
+    """Quiet sine tone whose length grows with the text (about 60 ms per character, max 30 s)."""
+    duration = min(max(len(text) * 0.06, 0.5), 30.0)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    frequency = 220 + int(_digest(text)[:2], 16)
+    samples = (0.1 * np.sin(2 * math.pi * frequency * t) * 32767).astype("<i2")
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def parse_multipart(body: bytes, content_type: str) -> Dict[str, bytes]:
+    """Minimal multipart/form-data parser (avoids the python-multipart dependency)."""
+    message = BytesParser().parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+    fields = {}
+    for part in message.get_payload() if message.is_multipart() else []:
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = part.get_payload(decode=True) or b""
+    return fields
+
+
+# ---------------------------------------------------------------------------
+# App
+# ---------------------------------------------------------------------------
+
+def create_app(behaviour: MockBehaviour) -> FastAPI:
+    """
+    Build the FastAPI app serving the OpenAI-compatible endpoints under /v1.
+
+    Args:
+        behaviour: Latency / error / script configuration
+
+    Returns:
+        FastAPI application
+    """
+    app = FastAPI(title="Mock OpenAI API")
+
+    @app.get("/v1/models")
+    async def list_models():
+        names = ["gpt-4o", "gpt-4o-mini", "whisper-1", "tts-1", *EMBEDDING_DIMENSIONS]
+        return {"object": "list", "data": [{"id": n, "object": "model", "created": 0, "owned_by": "mock"} for n in names]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        error = await behaviour.before_response("chat")
+        if error:
+            return error
+
+        content, tool_calls = chat_reply(body, behaviour)
+        completion_id = "chatcmpl-" + _digest(body.get("messages"))[:24]
+        created = int(time.time())
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream_chat(body, content, tool_calls, behaviour, completion_id, created),
+                media_type="text/event-stream"
+            )
+
+        message = {"role": "assistant", "content": content or None, "refusal": None}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "logprobs": None,
+                         "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            "usage": _chat_usage(body, content, tool_calls)
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        error = await behaviour.before_response("embeddings")
+        if error:
+            return error
+
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        model = body.get("model", "text-embedding-3-small")
+        dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS.get(model, 1536)
+        as_base64 = body.get("encoding_format") == "base64"
+
+        data = []
+        for index, text in enumerate(inputs):
+            vector = embed(text, dimensions)
+            encoded = base64.b64encode(vector.tobytes()).decode() if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": encoded})
+        tokens = sum(_count_tokens(t) if isinstance(t, str) else len(t) for t in inputs)
+        return {"object": "list", "data": data, "model": model,
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        fields = parse_multipart(await request.body(), request.headers.get("content-type", ""))
+        error = await behaviour.before_response("transcriptions")
+        if error:
+            return error
+
+        text = behaviour.transcript
+        response_format = fields.get("response_format", b"json").decode()
+        if response_format in ("text", "srt", "vtt"):
+            return PlainTextResponse(text + "\n")
+        if response_format == "verbose_json":
+            duration = len(fields.get("file", b"")) / (2 * SPEECH_SAMPLE_RATE)
+            language = fields.get("language", b"en").decode()
+            return {"task": "transcribe", "language": language, "duration": duration, "text": text, "segments": []}
+        return {"text": text}
+
+    @app.post("/v1/audio/speech")
+    async def speech(request: Request):
+        body = await request.json()
+        error = await behaviour.before_response("speech")
+        if error:
+            return error
+
+        audio = synthesize_wav(body.get("input", ""))
+        response_format = body.get("response_format", "mp3")
+        if response_format == "pcm":
+            audio = audio[44:]  # raw 16-bit samples without the WAV header
+        # Every other format is served as WAV; players sniff the content
+
+        async def chunks():
+            for start in range(0, len(audio), 4096):
+                if behaviour.token_latency_ms:
+                    await asyncio.sleep(behaviour.token_latency_ms / 1000)
+                yield audio[start:start + 4096]
+
+        return StreamingResponse(chunks(), media_type="audio/wav")
+
+    @app.get("/mock/stats")
+    async def stats():
+        return {"requests": dict(behaviour.requests), "injected_errors": dict(behaviour.errors)}
+
+    return app
+
+
+def load_script(path: Optional[str]) -> List[Dict[str, Any]]:
+    """Read scripted rules from a JSONL file (see module docstring)."""
+    if not path:
+        return []
+    with open(path, 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Standard deviation of the delay")
+    parser.add_argument("--token-latency-ms", type=float, default=0.0, help="Delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-statuses", default="429,500", help="Comma-separated statuses to inject")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--script", help="JSONL file with scripted responses")
+    parser.add_argument("--transcript", default=DEFAULT_TRANSCRIPT, help="Text returned by /v1/audio/transcriptions")
+    args = parser.parse_args()
+
+    behaviour = MockBehaviour(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        token_latency_ms=args.token_latency_ms,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(s) for s in args.error_statuses.split(",")),
+        seed=args.seed,
+        script=load_script(args.script),
+        transcript=args.transcript
+    )
+    print(f"Mock OpenAI API on http://{args.host}:{args.port}/v1")
+    print(f"  export OPENAI_BASE_URL=http://{args.host}:{args.port}/v1 OPENAI_API_KEY=mock")
+    uvicorn.run(create_app(behaviour), host=args.host, port=args.port, log_level="warning")